@@ -12,6 +12,7 @@ from flask_sqlalchemy import SQLAlchemy
 from config import Config
 from flask import Flask
 import mimetypes
+import re
 
 # Some hosting environments ship with an incomplete mimetypes database which
 # causes Flask's send_static_file (used by the `/static` route) to return
@@ -31,6 +32,9 @@ limiter = Limiter(key_func=get_remote_address)
 csrf = CSRFProtect()
 cache = Cache()
 
+# Checked against the Host header and remote address on every request
+IP_ADDRESS_RE = re.compile(r'^(\d+\.){3}\d+$')
+
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -68,6 +72,15 @@ def create_app(config_class=Config):
     # always call init_app without extra args; configuration is read from app.config
     limiter.init_app(app)
 
+    # Must run before CSRFProtect's hook, which reads request.form and would
+    # otherwise parse the whole body under the global MAX_CONTENT_LENGTH.
+    @app.before_request
+    def limit_profile_picture_upload():
+        """Cap the request body for the profile settings form"""
+        if request.endpoint == 'users.user_settings':
+            from app.forms import PROFILE_PICTURE_MAX_SIZE
+            request.max_content_length = PROFILE_PICTURE_MAX_SIZE + 64 * 1024
+
     csrf.init_app(app)
     cache.init_app(app)
 
@@ -315,13 +328,11 @@ def create_app(config_class=Config):
         request.remote_addr shouldn't block domain cookies for real subdomains!
         """
         from flask import request
-        import re
 
         host_without_port = request.host.split(':')[0]
-        ip_pattern = r'^(\d+\.){3}\d+$'
 
         # Case 1: Host header itself is an IP address (e.g., 127.0.0.1)
-        if re.match(ip_pattern, host_without_port):
+        if IP_ADDRESS_RE.match(host_without_port):
             # Direct IP access - use host-only cookie
             if app.config.get('SESSION_COOKIE_DOMAIN') is not None:
                 app.config['SESSION_COOKIE_DOMAIN'] = None
@@ -336,7 +347,7 @@ def create_app(config_class=Config):
         # Case 3: .local domain accessed via IP (e.g., my.libriya.local from 127.0.0.1)
         # This is local development - keep host-only cookie
         actual_client_ip = request.remote_addr
-        if host_without_port.endswith('.local') and re.match(ip_pattern, actual_client_ip):
+        if host_without_port.endswith('.local') and IP_ADDRESS_RE.match(actual_client_ip):
             if app.config.get('SESSION_COOKIE_DOMAIN') is not None:
                 app.config['SESSION_COOKIE_DOMAIN'] = None
             return
@@ -349,6 +360,15 @@ def create_app(config_class=Config):
             if app.config.get('SESSION_COOKIE_DOMAIN') != parent_domain:
                 app.config['SESSION_COOKIE_DOMAIN'] = parent_domain
 
+    @app.teardown_request
+    def clear_request_form_cache(exc=None):
+        """Drop per-request form data cached on ``g`` (see ``app.forms._genre_choices``).
+
+        ``g`` belongs to the app context, which may outlive a single request
+        (CLI commands, tests pushing their own context), so clear it explicitly.
+        """
+        g.pop('_book_genre_choices', None)
+
     # Add security headers
     @app.errorhandler(CSRFError)
     def handle_csrf_error(e):
@@ -418,6 +438,14 @@ def create_app(config_class=Config):
         app.logger.error(f'Server error: {error}')
         return render_template('errors/500.html'), 500
 
+    @app.errorhandler(413)
+    def request_entity_too_large(e):
+        """Handle the profile picture cap; other endpoints keep the plain 413"""
+        if request.endpoint != 'users.user_settings':
+            return e
+        flash(_('The uploaded file is too large.'), 'danger')
+        return redirect(request.referrer or url_for('main.home'))
+
     @app.errorhandler(429)
     def ratelimit_handler(e):
         """Handle rate limit exceeded"""
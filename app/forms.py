@@ -1,7 +1,10 @@
 from app.utils.validators import validate_username_field, validate_email_field, sanitize_string, validate_subdomain_field
-from app.models import Genre
+from app import db
+from app.models import Book, User
 from flask_babel import lazy_gettext as _, gettext as _real
 from datetime import datetime
+from flask import g
+from app.services.cache_service import get_genres_cached
 from app.utils.password_validator import validate_password_field
 from flask_wtf import FlaskForm
 from wtforms import (
@@ -10,8 +13,9 @@ from wtforms import (
 )
 from flask_wtf.file import FileField, FileAllowed, FileSize
 from wtforms.validators import (
-    DataRequired, Email, Length, EqualTo, Optional, ValidationError, NumberRange
+    DataRequired, Email, Length, EqualTo, Optional, ValidationError, StopValidation
 )
+from werkzeug.datastructures import FileStorage
 # Batch import form
 
 
@@ -31,27 +35,98 @@ class BatchImportForm(FlaskForm):
 class ISBNValidator:
     """Validator for ISBN-10 and ISBN-13 formats."""
 
+    # Shared lazy proxy; only resolved when a validation error is rendered.
+    default_message = _('Invalid ISBN format. Must be 10 or 13 digits.')
+
     def __init__(self, message=None):
-        self.message = (
-            message or _('Invalid ISBN format. Must be 10 or 13 digits.')
-        )
+        self.message = message
 
     def __call__(self, form, field):
         if field.data:
             # Remove hyphens and spaces
             isbn = field.data.replace('-', '').replace(' ', '')
+            message = self.message or self.default_message
 
             # Check length (ISBN-10 or ISBN-13)
             if len(isbn) == 10:
                 # ISBN-10: 9 cyfr + cyfra lub X/x
                 if not (isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] in ['X', 'x'])):
-                    raise ValidationError(self.message)
+                    raise ValidationError(message)
             elif len(isbn) == 13:
                 # ISBN-13: tylko cyfry
                 if not isbn.isdigit():
-                    raise ValidationError(self.message)
+                    raise ValidationError(message)
             else:
-                raise ValidationError(self.message)
+                raise ValidationError(message)
+
+
+class YearNotInFuture:
+    """Validator for a year between ``min`` and the current year.
+
+    ``NumberRange(max=datetime.now().year)`` on the class would freeze the
+    bound at import time, so long-running workers started in December would
+    reject books published in the new year.
+    """
+
+    default_message = _('Please enter a valid year (e.g. 1999).')
+
+    def __init__(self, min=0, message=None):
+        self.min = min
+        self.message = message
+        self.field_flags = {'min': min}
+
+    def __call__(self, form, field):
+        data = field.data
+        if data is not None and self.min <= data <= datetime.now().year:
+            return
+        raise ValidationError(self.message or self.default_message)
+
+
+class ImageMagicAllowed:
+    """Validator that checks an upload's leading bytes against image signatures.
+
+    ``FileAllowed`` only inspects the filename, so a renamed script passes it.
+    This reads the first few bytes of the stream (and rewinds it) instead of
+    letting Pillow decode a file that is not an image at all.
+    """
+
+    SIGNATURES = {
+        'jpeg': (b'\xff\xd8\xff',),
+        'png': (b'\x89PNG\r\n\x1a\n',),
+    }
+    HEAD_SIZE = 8
+
+    default_message = _('The uploaded file is not a valid image.')
+
+    def __init__(self, formats=('jpeg', 'png'), message=None):
+        self.signatures = tuple(sig for fmt in formats for sig in self.SIGNATURES[fmt])
+        self.message = message
+
+    def __call__(self, form, field):
+        data = field.data
+        if not (data and isinstance(data, FileStorage)):
+            return
+        stream = data.stream
+        position = stream.tell()
+        head = stream.read(self.HEAD_SIZE)
+        stream.seek(position)
+        if not head.startswith(self.signatures):
+            raise StopValidation(self.message or self.default_message)
+
+
+def _genre_choices():
+    """Return translated ``(id, name)`` genre choices, ordered by id.
+
+    Looked up on ``g`` first (one lookup per request, however many
+    ``BookForm`` instances a page builds); otherwise the genre rows come from
+    the shared cache and only the translation runs here.  The list is shared,
+    so callers must not mutate it.
+    """
+    choices = getattr(g, '_book_genre_choices', None)
+    if choices is None:
+        choices = [(genre.id, _real(genre.name)) for genre in get_genres_cached()]
+        g._book_genre_choices = choices
+    return choices
 
 
 class BookForm(FlaskForm):
@@ -101,9 +176,8 @@ class BookForm(FlaskForm):
         filters=[_year_filter],
         validators=[
             Optional(),
-            NumberRange(
+            YearNotInFuture(
                 min=0,
-                max=datetime.now().year,
                 message=_("Please enter a valid year (e.g. 1999).")
             )
         ]
@@ -118,7 +192,8 @@ class BookForm(FlaskForm):
             FileAllowed(
                 ['jpg', 'png', 'jpeg'],
                 _('Only image files (jpg, png, jpeg) are allowed!')
-            )
+            ),
+            ImageMagicAllowed()
         ]
     )
     # Hidden field to preserve cover URL on form validation errors
@@ -136,17 +211,9 @@ class BookForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        all_genres = Genre.query.all()
-
-        translated_genres = [(g.id, _real(g.name)) for g in all_genres]
-        sorted_translated_genres = sorted(
-            translated_genres,
-            key=lambda x: x[0]  # Sort by ID, not by name
-        )
-
-        self.genres.choices = sorted_translated_genres
+        self.genres.choices = _genre_choices()
         if 'obj' in kwargs and kwargs['obj'] is not None:
-            self.genres.data = [g.id for g in kwargs['obj'].genres]
+            self.genres.data = [genre.id for genre in kwargs['obj'].genres]
 
     def validate_title(self, field):
         field.data = sanitize_string(field.data, max_length=200)
@@ -185,11 +252,20 @@ class UserEditForm(FlaskForm):
                          "class": "btn btn-primary"})
 
 
+# Largest accepted profile picture; the settings view also caps the request
+# body just above this so oversized uploads are refused before parsing.
+PROFILE_PICTURE_MAX_SIZE = 2 * 1024 * 1024
+# Accepted profile picture extensions; the settings view names saved files
+# from this set rather than echoing whatever the client sent.
+PROFILE_PICTURE_EXTENSIONS = frozenset({'jpg', 'png'})
+
+
 class UserSettingsForm(FlaskForm):
     email = StringField(_('Email'), validators=[DataRequired(), Email()])
     picture = FileField(_('Update Profile Picture'), validators=[
-        FileAllowed(['jpg', 'png'], _('Images only!')),
-        FileSize(max_size=2 * 1024 * 1024,
+        FileAllowed(sorted(PROFILE_PICTURE_EXTENSIONS), _('Images only!')),
+        ImageMagicAllowed(),
+        FileSize(max_size=PROFILE_PICTURE_MAX_SIZE,
                  message=_('File size must be less than 2MB.'))
     ])
     password = PasswordField(_('New Password'), validators=[Optional(), validate_password_field])
@@ -225,18 +301,36 @@ class LibraryForm(FlaskForm):
         field.data = sanitize_string(field.data, max_length=100)
 
 
+class PkExistsSelectField(SelectField):
+    """SelectField whose submitted value is checked by primary-key lookup.
+
+    The default ``SelectField`` validates against ``choices``, which forces
+    the view to load every candidate row even on POST. This field runs a
+    single ``EXISTS`` query for ``model.id`` instead, so ``choices`` only
+    have to be populated when the form is rendered.
+    """
+
+    def __init__(self, label=None, validators=None, model=None, **kwargs):
+        kwargs.setdefault('coerce', int)
+        super().__init__(label, validators, **kwargs)
+        self.model = model
+
+    def pre_validate(self, form):
+        if self.data is None or not db.session.query(
+                db.exists().where(self.model.id == self.data)).scalar():
+            raise ValidationError(self.gettext('Not a valid choice.'))
+
+
 class LoanForm(FlaskForm):
-    book_id = SelectField(
+    book_id = PkExistsSelectField(
         _('Book'),
-        coerce=int,
-        validators=[DataRequired()],
-        validate_choice=False
+        model=Book,
+        validators=[DataRequired()]
     )
-    user_id = SelectField(
+    user_id = PkExistsSelectField(
         _('User'),
-        coerce=int,
-        validators=[DataRequired()],
-        validate_choice=False
+        model=User,
+        validators=[DataRequired()]
     )
     submit = SubmitField(
         _('Submit'),
@@ -301,7 +395,7 @@ class RegistrationForm(FlaskForm):
         # Only validate if user is joining existing tenant and field has data
         if self.create_new_tenant.data == 'false' and field.data:
             from app.models import InvitationCode
-            code = InvitationCode.query.filter_by(code=field.data).first()
+            code = InvitationCode.find_by_code(field.data)
             if not code:
                 raise ValidationError(_('Invalid invitation code'))
             if not code.is_valid():
@@ -318,7 +412,7 @@ class RegistrationForm(FlaskForm):
         inv_code_val = self.invitation_code.data if self.invitation_code.data else None
         if inv_code_val:
             # Joining existing tenant via invitation code — check within that tenant only
-            code = InvitationCode.query.filter_by(code=inv_code_val).first()
+            code = InvitationCode.find_by_code(inv_code_val)
             if code:
                 user = User.query.filter_by(username=field.data, tenant_id=code.tenant_id).first()
                 if user:
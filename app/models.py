@@ -1,14 +1,50 @@
-from sqlalchemy import event
+from sqlalchemy import and_, event, func, insert, inspect, or_, select, update
+from sqlalchemy.ext.hybrid import hybrid_method
+from sqlalchemy.orm import column_property
 import html
 import os
 from flask import current_app
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 import datetime
 import secrets
 import hashlib
+import hmac
 from datetime import timedelta
+from operator import attrgetter
+
+
+def _needs_lazy_load(instance, *attrs):
+    """Return True if reading any of ``attrs`` on a persisted row would emit SQL.
+
+    ``__str__`` methods use this to fall back to a PK-only label, so logging
+    or printing rows in a loop never fires one lazy load per row.
+    """
+    state = inspect(instance)
+    return state.has_identity and not state.unloaded.isdisjoint(attrs)
+
+
+def _hash_token(token):
+    """Fingerprint a one-time token for storage (BLAKE2b, 64 hex chars)."""
+    return hashlib.blake2b(token.encode(), digest_size=32).hexdigest()
+
+
+def _token_hash_candidates(token):
+    """Hashes a stored token may have: current BLAKE2b and the legacy sha256.
+
+    Tokens issued before the switch stay valid until they expire (at most
+    24h); the sha256 candidate can be dropped once those have aged out.
+    """
+    return [_hash_token(token), hashlib.sha256(token.encode()).hexdigest()]
+
+
+# Premium feature id -> Tenant flag column, in display order
+PREMIUM_FEATURE_FIELDS = {
+    'bookcover_api': 'premium_bookcover_enabled',
+    'biblioteka_narodowa': 'premium_biblioteka_narodowa_enabled',
+    'batch_import': 'premium_batch_import_enabled',
+    'google_books': 'premium_google_books_enabled',
+}
 
 
 class Tenant(db.Model):
@@ -46,9 +82,14 @@ class Tenant(db.Model):
     # records to be cleared when a `Tenant` object is removed from the
     # session.  We handle the actual book cover file cleanup via a SQLAlchemy
     # event listener further down.
-    libraries = db.relationship('Library', backref='tenant', lazy=True,
+    # Unbounded per tenant: exposed as queries so callers count/limit in SQL
+    libraries = db.relationship('Library', back_populates='tenant', lazy='dynamic',
                                 cascade='all, delete-orphan')
-    users = db.relationship('User', backref='tenant', lazy=True)
+    users = db.relationship('User', back_populates='tenant', lazy='dynamic')
+    invitation_codes = db.relationship('InvitationCode', back_populates='tenant', lazy='dynamic')
+    admin_conversations = db.relationship('AdminSuperAdminConversation', back_populates='tenant', lazy=True)
+    audit_log_files = db.relationship('AuditLogFile', back_populates='tenant', lazy=True)
+    audit_logs = db.relationship('AuditLog', back_populates='tenant', lazy=True)
 
     def has_unlimited_libraries(self):
         return self.max_libraries is None or self.max_libraries < 0
@@ -59,42 +100,28 @@ class Tenant(db.Model):
     def can_add_library(self):
         if self.has_unlimited_libraries():
             return True
-        return len(self.libraries) < self.max_libraries
+        count = db.session.scalar(select(func.count(Library.id)).where(Library.tenant_id == self.id))
+        return count < self.max_libraries
 
     def can_add_book(self):
         if self.has_unlimited_books():
             return True
-        # Sum all books in all libraries for this tenant
-        return sum(len(lib.books) for lib in self.libraries) < self.max_books
+        # Count in SQL rather than loading every library's book collection
+        count = db.session.scalar(select(func.count(Book.id)).where(Book.tenant_id == self.id))
+        return count < self.max_books
 
     def __str__(self):
         return f"{self.name} ({self.subdomain})"
 
     def get_enabled_premium_features(self):
         """Return list of enabled premium features for this tenant."""
-        features = []
-        if self.premium_bookcover_enabled:
-            features.append('bookcover_api')
-        if self.premium_biblioteka_narodowa_enabled:
-            features.append('biblioteka_narodowa')
-        if self.premium_batch_import_enabled:
-            features.append('batch_import')
-        if self.premium_google_books_enabled:
-            features.append('google_books')
-        return features
+        return [feature_id for feature_id, field_name in PREMIUM_FEATURE_FIELDS.items()
+                if getattr(self, field_name)]
 
     def is_premium_enabled(self, feature_id):
         """Check if a specific premium feature is enabled for this tenant."""
-        feature_map = {
-            'bookcover_api': 'premium_bookcover_enabled',
-            'biblioteka_narodowa': 'premium_biblioteka_narodowa_enabled',
-            'batch_import': 'premium_batch_import_enabled',
-            'google_books': 'premium_google_books_enabled',
-        }
-        field_name = feature_map.get(feature_id)
-        if field_name:
-            return getattr(self, field_name, False)
-        return False
+        field_name = PREMIUM_FEATURE_FIELDS.get(feature_id)
+        return bool(field_name and getattr(self, field_name))
 
 
 # Define the association table for book-author relationship
@@ -133,21 +160,32 @@ class Library(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False, index=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), nullable=False)
+    tenant = db.relationship('Tenant', back_populates='libraries')
     # When a library is deleted, remove all associated books from the
     # database too.  Each `Book` has its own event listener to delete the
     # cover file from disk.
     books = db.relationship('Book', back_populates='library', lazy=True,
                             cascade='all, delete-orphan')
-    users = db.relationship('User', secondary='user_libraries', lazy='subquery',
+    users = db.relationship('User', secondary='user_libraries', lazy=True,
                             viewonly=True, overlaps='user_library_memberships')
     user_library_memberships = db.relationship('UserLibrary', back_populates='library',
-                                               lazy='subquery', overlaps='users')
+                                               lazy=True, overlaps='users')
+    access_requests = db.relationship('LibraryAccessRequest', back_populates='library', lazy=True)
+    invitation_codes = db.relationship('InvitationCode', back_populates='library', lazy='dynamic')
+    shared_links = db.relationship('SharedLink', back_populates='library', lazy=True)
+    contact_messages = db.relationship('ContactMessage', back_populates='library', lazy=True)
     loan_overdue_days = db.Column(db.Integer, nullable=False, default=14)
 
     def __str__(self):
         return self.name
 
 
+# Closed value sets stored as native ENUM columns (1 byte on MySQL, 4 on
+# PostgreSQL) instead of VARCHAR(50).
+BOOK_STATUSES = ('available', 'reserved', 'on_loan')
+LOAN_STATUSES = ('pending', 'active', 'returned', 'cancelled')
+
+
 class Book(db.Model):
     """Book entity stored in a library.
 
@@ -155,11 +193,23 @@ class Book(db.Model):
         id (int): Primary key
         library_id (int): FK to `Library`
         tenant_id (int): FK to `Tenant`
-        isbn (str): ISBN number if present
+        isbn (str): Normalized ISBN-10/13 (no hyphens) if present
         title (str): Book title
         year (int): Publication year
         status (str): Availability status ('available', 'reserved', 'on_loan')
     """
+    __table_args__ = (
+        # Partial index for the catalogue's "available" filter; dialects
+        # without partial indexes (MySQL) build a plain index on status.
+        db.Index('ix_book_available', 'status',
+                 postgresql_where=db.text("status = 'available'"),
+                 sqlite_where=db.text("status = 'available'")),
+        # "available books in library X" (catalogue and loan form filters)
+        db.Index('ix_book_lib_status', 'library_id', 'status'),
+        # tenant admin catalogue filtered by status
+        db.Index('ix_book_tenant_status', 'tenant_id', 'status'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     library_id = db.Column(db.Integer, db.ForeignKey('library.id'), nullable=False)
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), nullable=False)
@@ -172,6 +222,21 @@ class Book(db.Model):
             return value
         return html.unescape(value)
 
+    @staticmethod
+    def normalize_isbn(value):
+        """Return the canonical ISBN key: digits plus an optional trailing 'X'.
+
+        Hyphens and spaces are stripped and a lowercase ISBN-10 check digit
+        is upper-cased, so every stored ISBN is a bare 10 or 13 character
+        key.  Lookups must go through this helper as well, otherwise
+        ``978-83-...`` and ``97883...`` would miss each other in the index.
+        Blank values become ``None``.
+        """
+        if value is None:
+            return None
+        cleaned = value.replace('-', '').replace(' ', '').strip().upper()
+        return cleaned or None
+
     @db.validates('isbn')
     def _normalize_isbn(self, key, value):
         """Normalize and clean ISBN values before they're saved.
@@ -184,17 +249,14 @@ class Book(db.Model):
         true NULL.  Multiple NULLs are permitted by the unique index and
         the problem disappears.
         """
-        if value is None:
-            return None
-        # strip whitespace and collapse empty strings
-        cleaned = value.strip()
-        return cleaned or None
+        return self.normalize_isbn(value)
+
     authors = db.relationship(
-        'Author', secondary=book_authors, lazy='subquery', back_populates='books')
+        'Author', secondary=book_authors, lazy='selectin', back_populates='books')
 
     # Relationship for multiple genres
     genres = db.relationship(
-        'Genre', secondary=book_genres, lazy='subquery', back_populates='books')
+        'Genre', secondary=book_genres, lazy='selectin', back_populates='books')
 
     library = db.relationship('Library', back_populates='books')
     location = db.relationship('Location', back_populates='book', uselist=False, cascade='all, delete-orphan')
@@ -214,15 +276,39 @@ class Book(db.Model):
     cover = db.Column(db.String(200))
     description = db.Column(db.Text, nullable=True)
     # 'available', 'reserved', 'on_loan'
-    status = db.Column(db.String(50), default='available', nullable=False)
+    status = db.Column(db.Enum(*BOOK_STATUSES, name='book_status'), default='available', nullable=False)
 
-    comments = db.relationship('Comment', back_populates='book', lazy=True, cascade='all, delete-orphan')
+    comments = db.relationship('Comment', back_populates='book', lazy='dynamic', cascade='all, delete-orphan')
+    # Grows with every loan and is always filtered, so expose it as a query
+    loans = db.relationship('Loan', back_populates='book', lazy='dynamic')
+    favorited_by = db.relationship('User', secondary=favorites, back_populates='favorites', lazy=True)
+
+    def change_status(self, from_status, to_status):
+        """Move the book from ``from_status`` to ``to_status`` if it is still there.
+
+        Runs one conditional ``UPDATE ... WHERE status = from_status`` so two
+        concurrent borrowers cannot both claim an available copy.  Returns
+        True if this call made the change; otherwise ``status`` is refreshed
+        from the database so callers can report the real state.
+        """
+        result = db.session.execute(
+            update(Book).where(Book.id == self.id, Book.status == from_status).values(status=to_status))
+        if result.rowcount == 1:
+            return True
+        db.session.refresh(self, ['status'])
+        return False
+
+    @property
+    def author_names(self):
+        """Comma-separated author display names, as shown in book lists."""
+        # ``str(author)`` returns the formatted display name
+        return ", ".join(map(str, self.authors))
 
     def __str__(self):
-        # use ``str(author)`` which now returns the formatted display name
-        author_names = ", ".join([str(author) for author in self.authors])
-        genre_names = ", ".join([genre.name for genre in self.genres])
-        return f"{self.title} by {author_names} ({self.year}) - Genres: {genre_names}"
+        if _needs_lazy_load(self, 'authors', 'genres'):
+            return f"Book #{self.id}: {self.title}"
+        genre_names = ", ".join(map(attrgetter('name'), self.genres))
+        return f"{self.title} by {self.author_names} ({self.year}) - Genres: {genre_names}"
 
 
 # ---------------------------------------------------------------------------
@@ -288,8 +374,10 @@ class Author(db.Model):
     """
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, index=True)
+    # Parent -> books is never rendered in lists; keep it lazy so loading
+    # Book.authors does not cascade into every book by the same author.
     books = db.relationship('Book', secondary=book_authors,
-                            lazy='subquery', back_populates='authors')
+                            lazy=True, back_populates='authors')
 
     @staticmethod
     def format_name(name: str) -> str:
@@ -314,6 +402,33 @@ class Author(db.Model):
         firsts = " ".join(parts[:-1])
         return f"{last} {firsts}"
 
+    @classmethod
+    def get_or_create_many(cls, names):
+        """Return ``Author`` rows for ``names`` in order, creating missing ones.
+
+        Existing authors are fetched with a single ``IN`` query instead of one
+        lookup per name; new ones are added to the session and inserted with
+        the book on flush.  Matching compares ``lower(name)`` so it is
+        case-insensitive on every backend (SQLite's ``lower`` only folds
+        ASCII), and duplicate names collapse to one author.
+        """
+        unique = list(dict.fromkeys(n for n in names if n))
+        if not unique:
+            return []
+        keys = list(dict.fromkeys(n.lower() for n in unique))
+        by_key = {}
+        for author in cls.query.filter(func.lower(cls.name).in_(keys)).order_by(cls.id).all():
+            by_key.setdefault(author.name.lower(), author)
+        result = []
+        for name in unique:
+            author = by_key.get(name.lower())
+            if author is None:
+                author = by_key[name.lower()] = cls(name=name)
+                db.session.add(author)
+            if author not in result:
+                result.append(author)
+        return result
+
     @property
     def display_name(self) -> str:
         """Convenience property for use in templates and string representations."""
@@ -334,13 +449,24 @@ class Genre(db.Model):
     """
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False, index=True)
+    # Lazy for the same reason as Author.books: genre lookups (form choices,
+    # Book.genres) must not pull in every book of the genre.
     books = db.relationship('Book', secondary=book_genres,
-                            lazy='subquery', back_populates='genres')
+                            lazy=True, back_populates='genres')
 
     def __str__(self):
         return self.name
 
 
+@event.listens_for(Genre, 'after_insert')
+@event.listens_for(Genre, 'after_update')
+@event.listens_for(Genre, 'after_delete')
+def _invalidate_genre_cache(mapper, connection, target):
+    """Drop the shared genre list so every worker re-reads it."""
+    from app.services.cache_service import invalidate_genre_cache
+    invalidate_genre_cache()
+
+
 class User(UserMixin, db.Model):
     """Application user model.
 
@@ -358,16 +484,18 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
-    password_hash = db.Column(db.String(255), nullable=False)  # INCREASED from 128 to 255 to accommodate PBKDF2 hashes
+    password_hash = db.Column(db.String(255), nullable=False)  # 255 fits Argon2id and legacy PBKDF2 hashes
     # Email verification status
     is_email_verified = db.Column(db.Boolean, default=False, nullable=False)
     image_file = db.Column(db.String(20), nullable=False,
                            default='default.jpg')
     first_name = db.Column(db.String(50), nullable=True)
     last_name = db.Column(db.String(50), nullable=True)
-    loans = db.relationship('Loan', back_populates='user', lazy=True)
+    # Full history grows without bound; queried with filters/ordering instead
+    loans = db.relationship('Loan', back_populates='user', lazy='dynamic')
     role = db.Column(db.String(20), nullable=False, default='user')  # 'user', 'manager', 'admin'
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), nullable=True)  # NULL for super-admin
+    tenant = db.relationship('Tenant', back_populates='users')
     preferred_locale = db.Column(db.String(5), nullable=False, default='en')   # 'en', 'pl'
 
     @property
@@ -394,20 +522,33 @@ class User(UserMixin, db.Model):
         """Legacy: Super-admin had role='admin' and tenant_id=NULL (deprecated)"""
         return self.role == 'admin' and self.tenant_id is None
 
-    libraries = db.relationship('Library', secondary='user_libraries', lazy='subquery',
+    libraries = db.relationship('Library', secondary='user_libraries', lazy='selectin',
                                 viewonly=True, overlaps='user_library_memberships')
     user_library_memberships = db.relationship('UserLibrary', back_populates='user',
-                                               lazy='subquery', cascade='all, delete-orphan',
+                                               lazy='selectin', cascade='all, delete-orphan',
                                                overlaps='libraries')
-    favorites = db.relationship('Book', secondary=favorites, lazy='subquery',
-                                backref=db.backref('favorited_by', lazy=True))
+    favorites = db.relationship('Book', secondary=favorites, lazy='selectin',
+                                back_populates='favorited_by')
     # Add relation to notifications
     received_notifications = db.relationship(
         'Notification', foreign_keys='Notification.recipient_id', back_populates='recipient', lazy=True, cascade='all, delete-orphan')
     sent_notifications = db.relationship(
         'Notification', foreign_keys='Notification.sender_id', back_populates='sender', lazy=True)
 
-    comments = db.relationship('Comment', back_populates='user', lazy=True, cascade='all, delete-orphan')
+    comments = db.relationship('Comment', back_populates='user', lazy='dynamic', cascade='all, delete-orphan')
+
+    access_requests = db.relationship('LibraryAccessRequest', back_populates='user', lazy=True)
+    generated_invitations = db.relationship(
+        'InvitationCode', foreign_keys='InvitationCode.created_by_id', back_populates='created_by', lazy=True)
+    registered_via_invitation = db.relationship(
+        'InvitationCode', foreign_keys='InvitationCode.used_by_id', back_populates='used_by', lazy=True)
+    generated_shares = db.relationship('SharedLink', back_populates='created_by', lazy=True)
+    contact_messages = db.relationship(
+        'ContactMessage', foreign_keys='ContactMessage.user_id', back_populates='user', lazy=True)
+    admin_super_admin_conversations = db.relationship(
+        'AdminSuperAdminConversation', back_populates='admin', lazy=True)
+    password_reset_tokens = db.relationship('PasswordResetToken', back_populates='user', lazy=True)
+    email_verification_tokens = db.relationship('EmailVerificationToken', back_populates='user', lazy=True)
 
     @staticmethod
     def for_tenant(tenant_id):
@@ -417,10 +558,18 @@ class User(UserMixin, db.Model):
         return self.username
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        from app.utils.password_handler import hash_password
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        from app.utils.password_handler import hash_password, verify_password, password_needs_rehash
+        if not verify_password(password, self.password_hash):
+            return False
+        # Transparently upgrade legacy PBKDF2/scrypt hashes (or outdated
+        # Argon2 parameters); the caller commits the session.
+        if password_needs_rehash(self.password_hash):
+            self.password_hash = hash_password(password)
+        return True
 
     @property
     def managed_libraries(self):
@@ -447,6 +596,23 @@ class UserLibrary(db.Model):
                               overlaps='users')
 
 
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    """Evict the cached login user whenever its row changes."""
+    from app.services.cache_service import invalidate_user_cache
+    invalidate_user_cache(target.id)
+
+
+@event.listens_for(UserLibrary, 'after_insert')
+@event.listens_for(UserLibrary, 'after_update')
+@event.listens_for(UserLibrary, 'after_delete')
+def _invalidate_cached_member(mapper, connection, target):
+    """Memberships are eager-loaded on the cached user, so evict it too."""
+    from app.services.cache_service import invalidate_user_cache
+    invalidate_user_cache(target.user_id)
+
+
 class Loan(db.Model):
     """Represents a loan/reservation of a book by a user.
 
@@ -455,8 +621,21 @@ class Loan(db.Model):
         book_id (int): FK to `Book`
         user_id (int): FK to `User`
         tenant_id (int): FK to `Tenant`
-        status (str): Loan status ('pending','issued','returned')
+        status (str): Loan status ('pending', 'active', 'returned', 'cancelled')
     """
+    __table_args__ = (
+        # Only pending/active loans are looked up by status on hot paths;
+        # returned/cancelled history is kept out of the partial index.
+        db.Index('ix_loan_open', 'status',
+                 postgresql_where=db.text("status IN ('pending', 'active')"),
+                 sqlite_where=db.text("status IN ('pending', 'active')")),
+        # "active loans for user X" / "who currently has book Y"
+        db.Index('ix_loan_user_status', 'user_id', 'status'),
+        db.Index('ix_loan_book_status', 'book_id', 'status'),
+        # "pending loans in tenant X" on the admin dashboard
+        db.Index('ix_loan_tenant_status', 'tenant_id', 'status'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     book_id = db.Column(db.Integer, db.ForeignKey('book.id', ondelete='CASCADE'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -465,9 +644,9 @@ class Loan(db.Model):
     issue_date = db.Column(db.DateTime)
     return_date = db.Column(db.DateTime)
 
-    status = db.Column(db.String(50), default='pending', nullable=False)
+    status = db.Column(db.Enum(*LOAN_STATUSES, name='loan_status'), default='pending', nullable=False)
 
-    book = db.relationship('Book', backref='loans')
+    book = db.relationship('Book', back_populates='loans')
     user = db.relationship('User', back_populates='loans')
 
     # Add relation to the notifications
@@ -479,6 +658,8 @@ class Loan(db.Model):
         return Loan.query.filter_by(tenant_id=tenant_id)
 
     def __str__(self):
+        if _needs_lazy_load(self, 'book', 'user'):
+            return f"Loan {self.id}: book #{self.book_id} to user #{self.user_id} - Status: {self.status}"
         return f"Loan {self.id}: {self.book.title} to {self.user.username} - Status: {self.status}"
 
 
@@ -492,13 +673,22 @@ class Notification(db.Model):
         message (str): Notification text
         type (str): Notification type identifier
     """
+    __table_args__ = (
+        # Notification bell (unread count) and the per-user notification list
+        db.Index('ix_notif_recipient_unread', 'recipient_id', 'is_read'),
+        db.Index('ix_notif_recipient_timestamp', 'recipient_id', 'timestamp'),
+        db.Index('ix_notif_unread', 'recipient_id',
+                 postgresql_where=db.text('is_read = false'),
+                 sqlite_where=db.text('is_read = 0')),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     recipient_id = db.Column(
         db.Integer, db.ForeignKey('user.id'), nullable=False)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     message = db.Column(db.String(500), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    is_read = db.Column(db.Boolean, default=False)
+    is_read = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
     type = db.Column(db.String(100), nullable=False)
     loan_id = db.Column(db.Integer, db.ForeignKey('loan.id'), nullable=True)
     contact_message_id = db.Column(db.Integer, db.ForeignKey('contact_message.id'), nullable=True)
@@ -510,7 +700,19 @@ class Notification(db.Model):
     loan = db.relationship('Loan', back_populates='notifications')
     contact_message = db.relationship('ContactMessage')
 
+    @staticmethod
+    def bulk_create(rows):
+        """Insert notifications from column dicts in a single executemany INSERT.
+
+        Used for fan-out to many recipients: no `Notification` instances are
+        built or added to the session. Every dict must have the same keys.
+        """
+        if rows:
+            db.session.execute(insert(Notification), rows)
+
     def __str__(self):
+        if _needs_lazy_load(self, 'recipient'):
+            return f"Notification for user #{self.recipient_id}: {self.message[:50]}..."
         return f"Notification for {self.recipient.username}: {self.message[:50]}..."
 
 
@@ -529,14 +731,16 @@ class LibraryAccessRequest(db.Model):
     status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'approved', 'rejected'
     timestamp = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
-    user = db.relationship('User', backref='access_requests')
-    library = db.relationship('Library', backref='access_requests')
+    user = db.relationship('User', back_populates='access_requests')
+    library = db.relationship('Library', back_populates='access_requests')
 
     @staticmethod
     def for_tenant(tenant_id):
         return LibraryAccessRequest.query.join(Library).filter(Library.tenant_id == tenant_id)
 
     def __str__(self):
+        if _needs_lazy_load(self, 'user', 'library'):
+            return f"Request from user #{self.user_id} for library #{self.library_id} - Status: {self.status}"
         return f"Request from {self.user.username} for {self.library.name} - Status: {self.status}"
 
 
@@ -566,6 +770,8 @@ class Comment(db.Model):
         return Comment.query.join(Book).filter(Book.tenant_id == tenant_id)
 
     def __str__(self):
+        if _needs_lazy_load(self, 'user', 'book'):
+            return f"Comment by user #{self.user_id} on book #{self.book_id} at {self.timestamp}"
         return f"Comment by {self.user.username} on {self.book.title} at {self.timestamp}"
 
 
@@ -585,20 +791,20 @@ class InvitationCode(db.Model):
     # Kto wygenerował
     created_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_by = db.relationship('User', foreign_keys=[created_by_id],
-                                 backref='generated_invitations')
+                                 back_populates='generated_invitations')
 
     # Do której biblioteki
     library_id = db.Column(db.Integer, db.ForeignKey('library.id'), nullable=False)
-    library = db.relationship('Library', backref='invitation_codes')
+    library = db.relationship('Library', back_populates='invitation_codes')
 
     # Do którego tenanta
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), nullable=False)
-    tenant = db.relationship('Tenant', backref='invitation_codes')
+    tenant = db.relationship('Tenant', back_populates='invitation_codes')
 
     # Śledzenie użycia
     used_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     used_by = db.relationship('User', foreign_keys=[used_by_id],
-                              backref='registered_via_invitation')
+                              back_populates='registered_via_invitation')
 
     # Czasowe
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -612,19 +818,43 @@ class InvitationCode(db.Model):
     # role granted in the library when the code is used
     library_role = db.Column(db.String(20), nullable=False, default='member')
 
+    @hybrid_method
     def is_valid(self):
         """Sprawdza czy kod jest jeszcze ważny i nieużyty"""
         return (self.used_by_id is None and
                 self.expires_at > datetime.datetime.utcnow())
 
+    @is_valid.expression
+    def is_valid(cls):
+        # Compared against the app's utcnow(), as stored; DB now() may be local time
+        return and_(cls.used_by_id.is_(None), cls.expires_at > datetime.datetime.utcnow())
+
+    @staticmethod
+    def find_by_code(code):
+        """Return the `InvitationCode` matching ``code`` or None.
+
+        Input is normalised to the generated form (upper-case hex) so lookups
+        behave the same on case-sensitive and case-insensitive collations, and
+        the stored value is confirmed with a constant-time comparison so a
+        collation-level match (trailing spaces, case folding) never counts.
+        """
+        if not code:
+            return None
+        code = code.strip().upper()
+        invitation = InvitationCode.query.filter_by(code=code).first()
+        if invitation is None or not hmac.compare_digest(invitation.code.encode(), code.encode()):
+            return None
+        return invitation
+
     def mark_as_used(self, user_id):
-        """Oznacz kod jako użyty"""
+        """Oznacz kod jako użyty (commit wykonuje wywołujący)"""
         self.used_by_id = user_id
         self.used_at = datetime.datetime.utcnow()
-        db.session.commit()
+        return self
 
     def __str__(self):
-        base = f"Code {self.code} for {self.library.name} - {'Active' if self.is_valid() else 'Inactive'}"
+        library = f"library #{self.library_id}" if _needs_lazy_load(self, 'library') else self.library.name
+        base = f"Code {self.code} for {library} - {'Active' if self.is_valid() else 'Inactive'}"
         if self.recipient_email:
             base += f" (sent to {self.recipient_email})"
         return base
@@ -651,9 +881,10 @@ class SharedLink(db.Model):
     expires_at = db.Column(db.DateTime, nullable=True)
     active = db.Column(db.Boolean, default=True, nullable=False)
 
-    library = db.relationship('Library', backref='shared_links')
-    created_by = db.relationship('User', backref='generated_shares')
+    library = db.relationship('Library', back_populates='shared_links')
+    created_by = db.relationship('User', back_populates='generated_shares')
 
+    @hybrid_method
     def is_valid(self):
         if not self.active:
             return False
@@ -661,9 +892,15 @@ class SharedLink(db.Model):
             return False
         return True
 
+    @is_valid.expression
+    def is_valid(cls):
+        return and_(cls.active.is_(True),
+                    or_(cls.expires_at.is_(None), cls.expires_at >= datetime.datetime.utcnow()))
+
     def __str__(self):
         status = 'active' if self.is_valid() else 'inactive'
-        return f"Share {self.token} for {self.library.name} ({status})"
+        library = f"library #{self.library_id}" if _needs_lazy_load(self, 'library') else self.library.name
+        return f"Share {self.token} for {library} ({status})"
 
 
 # Model wiadomości kontaktowej
@@ -680,9 +917,9 @@ class ContactMessage(db.Model):
     """
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
-    user = db.relationship('User', foreign_keys=[user_id], backref='contact_messages')
+    user = db.relationship('User', foreign_keys=[user_id], back_populates='contact_messages')
     library_id = db.Column(db.Integer, db.ForeignKey('library.id'), nullable=False)
-    library = db.relationship('Library', backref='contact_messages')
+    library = db.relationship('Library', back_populates='contact_messages')
     subject = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -695,8 +932,8 @@ class ContactMessage(db.Model):
     replied_at = db.Column(db.DateTime, nullable=True)
 
     # Status
-    read_by_admin = db.Column(db.Boolean, default=False)
-    is_resolved = db.Column(db.Boolean, default=False)
+    read_by_admin = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
+    is_resolved = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
 
     @staticmethod
     def for_tenant(tenant_id):
@@ -714,39 +951,50 @@ class AdminSuperAdminConversation(db.Model):
     subject = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, index=True)
 
-    tenant = db.relationship('Tenant', backref='admin_conversations')
-    admin = db.relationship('User', backref='admin_super_admin_conversations')
-    messages = db.relationship('AdminSuperAdminMessage', backref='conversation',
+    tenant = db.relationship('Tenant', back_populates='admin_conversations')
+    admin = db.relationship('User', back_populates='admin_super_admin_conversations')
+    messages = db.relationship('AdminSuperAdminMessage', back_populates='conversation',
                                cascade='all, delete-orphan', lazy=True)
 
     def __str__(self):
         return f"Conversation: {self.subject} (Tenant: {self.tenant.name})"
 
-    @property
-    def unread_count(self):
-        """Count unread messages for super-admin"""
-        return AdminSuperAdminMessage.query.filter_by(
-            conversation_id=self.id,
-            read=False
-        ).count()
-
 
 class AdminSuperAdminMessage(db.Model):
     """Individual message in conversation between admin and super-admin"""
+    __table_args__ = (
+        # AdminSuperAdminConversation.unread_count
+        db.Index('ix_adminmsg_conv_read', 'conversation_id', 'read'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey(
         'admin_super_admin_conversation.id'), nullable=False, index=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, index=True)
-    read = db.Column(db.Boolean, default=False)
+    read = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
 
+    conversation = db.relationship('AdminSuperAdminConversation', back_populates='messages')
     sender = db.relationship('User', foreign_keys=[sender_id])
 
     def __str__(self):
         return f"Message from {self.sender.username}: {self.message[:50]}..."
 
 
+# Unread messages for super-admin, as a correlated subquery. Deferred so it is
+# only computed where the inbox asks for it with undefer(); accessing it on a
+# single conversation still works and emits one query.
+AdminSuperAdminConversation.unread_count = column_property(
+    select(func.count(AdminSuperAdminMessage.id))
+    .where(AdminSuperAdminMessage.conversation_id == AdminSuperAdminConversation.id,
+           AdminSuperAdminMessage.read.is_(False))
+    .correlate_except(AdminSuperAdminMessage)
+    .scalar_subquery(),
+    deferred=True,
+)
+
+
 class AuditLogFile(db.Model):
     """Metadata for file-based audit logs.
 
@@ -762,7 +1010,7 @@ class AuditLogFile(db.Model):
     archived = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False, index=True)
 
-    tenant = db.relationship('Tenant', backref='audit_log_files')
+    tenant = db.relationship('Tenant', back_populates='audit_log_files')
 
     def __str__(self):
         return f"AuditLogFile: {self.filename} (tenant={self.tenant_id})"
@@ -771,7 +1019,7 @@ class AuditLogFile(db.Model):
 class PasswordResetToken(db.Model):
     """One-time password reset tokens (DB-backed).
 
-    Stores only the sha256 hash of the token so the raw token is only returned
+    Stores only the BLAKE2b hash of the token so the raw token is only returned
     once to be sent by email. Tokens are single-use and expire after a period.
     """
     id = db.Column(db.Integer, primary_key=True)
@@ -781,25 +1029,27 @@ class PasswordResetToken(db.Model):
     used = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
 
-    user = db.relationship('User', backref='password_reset_tokens')
+    user = db.relationship('User', back_populates='password_reset_tokens')
 
     @classmethod
     def generate_token(cls, user_id, expires_in=3600):
-        """Generate a token for user_id, store hash and return raw token."""
+        """Generate a token for user_id, add its hash to the session and return the raw token.
+
+        The caller commits, so the token can share a transaction with the
+        request's other changes; commit before sending the link out.
+        """
         token = secrets.token_urlsafe(32)
-        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        token_hash = _hash_token(token)
         now = datetime.datetime.utcnow()
         expires_at = now + timedelta(seconds=expires_in)
         entry = cls(user_id=user_id, token_hash=token_hash, expires_at=expires_at)
         db.session.add(entry)
-        db.session.commit()
         return token
 
     @classmethod
     def verify_token(cls, token):
         """Verify raw token and return DB entry if valid and not used/expired."""
-        token_hash = hashlib.sha256(token.encode()).hexdigest()
-        entry = cls.query.filter_by(token_hash=token_hash).first()
+        entry = cls.query.filter(cls.token_hash.in_(_token_hash_candidates(token))).first()
         if not entry:
             return None
         if entry.used:
@@ -809,8 +1059,9 @@ class PasswordResetToken(db.Model):
         return entry
 
     def mark_used(self):
+        """Flag the token as consumed; committed with the caller's transaction."""
         self.used = True
-        db.session.commit()
+        return self
 
     def __str__(self):
         return f"PasswordResetToken(user_id={self.user_id}, used={self.used}, expires_at={self.expires_at})"
@@ -819,7 +1070,7 @@ class PasswordResetToken(db.Model):
 class EmailVerificationToken(db.Model):
     """DB-backed email verification tokens (single-use).
 
-    Pattern mirrors PasswordResetToken: store only the sha256 hash, expire and single-use.
+    Pattern mirrors PasswordResetToken: store only the token hash, expire and single-use.
     """
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
@@ -828,24 +1079,22 @@ class EmailVerificationToken(db.Model):
     used = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
 
-    user = db.relationship('User', backref='email_verification_tokens')
+    user = db.relationship('User', back_populates='email_verification_tokens')
 
     @classmethod
     def generate_token(cls, user_id, expires_in=86400):
-        """Generate token for email verification (default 24h expiry)."""
+        """Generate token for email verification (default 24h expiry). The caller commits."""
         token = secrets.token_urlsafe(32)
-        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        token_hash = _hash_token(token)
         now = datetime.datetime.utcnow()
         expires_at = now + timedelta(seconds=expires_in)
         entry = cls(user_id=user_id, token_hash=token_hash, expires_at=expires_at)
         db.session.add(entry)
-        db.session.commit()
         return token
 
     @classmethod
     def verify_token(cls, token):
-        token_hash = hashlib.sha256(token.encode()).hexdigest()
-        entry = cls.query.filter_by(token_hash=token_hash).first()
+        entry = cls.query.filter(cls.token_hash.in_(_token_hash_candidates(token))).first()
         if not entry:
             return None
         if entry.used:
@@ -855,8 +1104,9 @@ class EmailVerificationToken(db.Model):
         return entry
 
     def mark_used(self):
+        """Flag the token as consumed; committed with the caller's transaction."""
         self.used = True
-        db.session.commit()
+        return self
 
     def __str__(self):
         return f"EmailVerificationToken(user_id={self.user_id}, used={self.used}, expires_at={self.expires_at})"
@@ -882,7 +1132,7 @@ class AuditLog(db.Model):
     success = db.Column(db.Boolean, default=True, nullable=False)
 
     actor = db.relationship('User', foreign_keys=[actor_id])
-    tenant = db.relationship('Tenant', backref='audit_logs')
+    tenant = db.relationship('Tenant', back_populates='audit_logs')
 
     def __repr__(self):
         return f"<AuditLog {self.id} action={self.action} actor={self.actor_id} tenant={self.tenant_id} ts={self.timestamp}>"
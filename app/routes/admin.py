@@ -6,9 +6,10 @@ from flask_login import login_required, current_user
 from flask_babel import _
 import logging
 import os
+from sqlalchemy import func
 
 from app import db, csrf
-from app.models import Tenant, User, Library, Book, AuditLogFile, AuditLog
+from app.models import Tenant, User, Library, Book, AuditLogFile, AuditLog, PREMIUM_FEATURE_FIELDS
 from app.forms import TenantForm
 from app.utils.decorators import role_required
 from app.utils.audit_log import log_action
@@ -77,9 +78,18 @@ def tenants_list():
     """List all tenants"""
     page = request.args.get('page', 1, type=int)
     tenants = Tenant.query.paginate(page=page, per_page=20)
+    # One grouped count per table for the whole page instead of loading
+    # every tenant's users and libraries
+    tenant_ids = [tenant.id for tenant in tenants.items]
+    user_counts = dict(db.session.query(User.tenant_id, func.count(User.id))
+                       .filter(User.tenant_id.in_(tenant_ids)).group_by(User.tenant_id).all())
+    library_counts = dict(db.session.query(Library.tenant_id, func.count(Library.id))
+                          .filter(Library.tenant_id.in_(tenant_ids)).group_by(Library.tenant_id).all())
     return render_template(
         'admin/tenants_list.html',
         tenants=tenants,
+        user_counts=user_counts,
+        library_counts=library_counts,
         title=_('Manage Tenants'),
         active_page='admin-tenants',
         parent_page='admin'
@@ -137,6 +147,8 @@ def tenant_detail(tenant_id):
     return render_template(
         'admin/tenant_detail.html',
         tenant=tenant,
+        users=tenant.users.limit(10).all(),
+        libraries=tenant.libraries.limit(5).all(),
         users_count=users_count,
         libraries_count=libraries_count,
         books_count=books_count,
@@ -205,7 +217,7 @@ def tenant_delete(tenant_id):
     # Prevent deletion if tenant still has users.  We can safely remove
     # libraries (and their books) automatically when the tenant is deleted,
     # but we don't want to orphan any user records.
-    if tenant.users:
+    if tenant.users.first() is not None:
         flash(
             _("Cannot delete tenant with existing users."),
             'danger'
@@ -335,18 +347,12 @@ def toggle_tenant_premium_feature(tenant_id, feature_id):
 
         # Synchronize valid_features with registry
         from app.services.premium.manager import PremiumManager
-        registry_map = {
-            'bookcover_api': 'premium_bookcover_enabled',
-            'biblioteka_narodowa': 'premium_biblioteka_narodowa_enabled',
-            'batch_import': 'premium_batch_import_enabled',
-            'google_books': 'premium_google_books_enabled',
-        }
         valid_features = {}
         available_features = PremiumManager.list_features()
         current_app.logger.info(f"[TOGGLE] available_features: {list(available_features.keys())}")
         for fid in available_features.keys():
-            if fid in registry_map:
-                valid_features[fid] = registry_map[fid]
+            if fid in PREMIUM_FEATURE_FIELDS:
+                valid_features[fid] = PREMIUM_FEATURE_FIELDS[fid]
 
         current_app.logger.info(f"[TOGGLE] valid_features: {list(valid_features.keys())}, received: {feature_id}")
         if feature_id not in valid_features:
@@ -722,8 +728,9 @@ def audit_entries_list():
 
     export_format = request.args.get('format')
     if export_format in ('csv', 'json'):
-        # Export full result set (no pagination)
-        entries = q.limit(10000).all()  # cap exports
+        # Export full result set (no pagination), streamed from the cursor in
+        # batches so a 10k-row export never holds every AuditLog at once
+        entries = q.limit(10000).yield_per(1000)  # cap exports
         if export_format == 'json':
             rows = []
             for e in entries:
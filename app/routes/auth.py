@@ -177,6 +177,7 @@ def login_post():
                 # Resend verification email (non-blocking)
                 try:
                     token = EmailVerificationToken.generate_token(user.id, expires_in=86400)
+                    db.session.commit()
                     verify_url = url_for('auth.verify_email', token=token, _external=True)
                     from app.utils.mailer import send_generic_email
                     send_generic_email(user.email, 'Verify your email address',
@@ -199,6 +200,10 @@ def login_post():
             # User is verified - proceed with normal login
             login_user(user, remember=remember)
 
+            # check_password() may have upgraded a legacy hash to Argon2id
+            if db.session.is_modified(user):
+                db.session.commit()
+
             try:
                 log_action('USER_LOGIN', f'User {user.username} logged in',
                            subject=user, additional_info={'user_id': user.id})
@@ -380,11 +385,13 @@ def register():
                 user.last_name = form.tenant_name.data if form.tenant_name.data else 'Admin'
 
                 db.session.add(user)
+                db.session.flush()  # Get user ID
+                # Verification token is committed together with the tenant and user
+                token = EmailVerificationToken.generate_token(user.id, expires_in=86400)
                 db.session.commit()
 
-                # Generate and send email verification token (non-blocking)
+                # Send email verification token (non-blocking)
                 try:
-                    token = EmailVerificationToken.generate_token(user.id, expires_in=86400)
                     verify_url = url_for('auth.verify_email', token=token, _external=True)
                     # Import inside function so tests can monkeypatch app.utils.mailer
                     from app.utils.mailer import send_generic_email
@@ -413,7 +420,7 @@ def register():
                     return render_template('auth/register.html', form=form, creating_new_tenant=creating_new_tenant)
 
                 # Get invitation code
-                code = InvitationCode.query.filter_by(code=form.invitation_code.data).first()
+                code = InvitationCode.find_by_code(form.invitation_code.data)
                 if not code:
                     flash(_('Invalid invitation code'), 'error')
                     return render_template('auth/register.html', form=form, creating_new_tenant=creating_new_tenant)
@@ -451,13 +458,14 @@ def register():
                 # Auto-verify email if it matches the invitation recipient
                 if code.recipient_email and code.recipient_email.lower() == user.email.lower():
                     user.is_email_verified = True
+                else:
+                    token = EmailVerificationToken.generate_token(user.id, expires_in=86400)
 
                 db.session.commit()
 
                 # Send verification email only if not already verified
                 if not user.is_email_verified:
                     try:
-                        token = EmailVerificationToken.generate_token(user.id, expires_in=86400)
                         verify_url = url_for('auth.verify_email', token=token, _external=True)
                         from app.utils.mailer import send_generic_email
                         send_generic_email(user.email, 'Verify your email address',
@@ -515,6 +523,7 @@ def password_reset():
     try:
         if user:
             token = PasswordResetToken.generate_token(user.id, expires_in=3600)
+            db.session.commit()
             try:
                 reset_url = url_for('auth.password_reset_confirm', token=token, _external=True)
                 # use module-level send_password_reset_email (allows tests to monkeypatch app.routes.auth.send_password_reset_email)
@@ -601,6 +610,7 @@ def send_email_verification():
 
     try:
         token = EmailVerificationToken.generate_token(user.id, expires_in=86400)
+        db.session.commit()
         verify_url = url_for('auth.verify_email', token=token, _external=True)
         from app.utils.mailer import send_generic_email
         send_generic_email(user.email, 'Verify your email address',
@@ -1,7 +1,6 @@
 import os
 from app.forms import BatchImportForm
 import secrets
-import requests
 from urllib.parse import urlparse
 from datetime import datetime
 from sqlalchemy import and_
@@ -17,6 +16,7 @@ from app import db, csrf, cache
 from app.forms import BookForm
 from app.models import Book, Author, Library, Location, Genre, Tenant, Loan, User
 from app.utils import role_required
+from app.utils.http_client import http_session
 from app.utils.audit_log import log_book_deleted, log_action
 from app.utils.messages import (
     SUCCESS_CREATED, SUCCESS_UPDATED, SUCCESS_DELETED, ERROR_PERMISSION_DENIED,
@@ -203,8 +203,11 @@ def get_genres_from_isbn():
                 current_app.logger.info(
                     f"Genres API - Found {len(book_data['genres'])} genres from premium service: {book_data['genres']}")
                 # Map genre names to IDs (genres are already mapped by GoogleBooksService)
+                genres_by_name = {}
+                for genre in Genre.query.filter(Genre.name.in_(book_data['genres'])).order_by(Genre.id):
+                    genres_by_name.setdefault(genre.name.lower(), genre)
                 for genre_name in book_data['genres']:
-                    genre = Genre.query.filter_by(name=genre_name).first()
+                    genre = genres_by_name.get(genre_name.lower())
                     if genre:
                         genres_info.append({'id': genre.id, 'name': genre.name})
                         current_app.logger.info(f"Genres API - Mapped '{genre_name}' to ID {genre.id}")
@@ -315,9 +318,13 @@ def book_detail(book_id):
         if parsed.path.endswith('/dashboard') or parsed.path.endswith('/index'):
             if parsed.query:
                 back_to_list_query = '?' + parsed.query
+
+    # Check the user's own (eager-loaded) favorites rather than loading every
+    # user who favorited the book via book.favorited_by
+    is_favorite = any(fav.id == book.id for fav in current_user.favorites)
     return render_template("books/book_detail.html", book=book, active_page="books",
                            user_comment=user_comment, comment_form=comment_form,
-                           back_to_list_query=back_to_list_query)
+                           back_to_list_query=back_to_list_query, is_favorite=is_favorite)
 
 
 @bp.route("/books/add/", methods=["GET", "POST"])
@@ -381,7 +388,7 @@ def book_add():
                 current_app.logger.info(f"[DEBUG] Set description for ISBN {form.isbn.data}: {description}")
 
         # Check for duplicate ISBN before attempting to insert
-        isbn_value = form.isbn.data or None
+        isbn_value = Book.normalize_isbn(form.isbn.data)
         if isbn_value:
             existing = Book.query.filter_by(isbn=isbn_value).first()
             if existing:
@@ -403,12 +410,7 @@ def book_add():
 
         author_names = [name.strip()
                         for name in form.author.data.split(',') if name.strip()]
-        for name in author_names:
-            author = Author.query.filter_by(name=name).first()
-            if not author:
-                author = Author(name=name)
-                db.session.add(author)
-            new_book.authors.append(author)
+        new_book.authors.extend(Author.get_or_create_many(author_names))
 
         selected_genres = form.genres.data
         if selected_genres:
@@ -420,7 +422,7 @@ def book_add():
             # User uploaded a file directly
             f = form.cover.data
             _stem, f_ext = os.path.splitext(f.filename)
-            cover_filename = secrets.token_hex(8) + f_ext
+            cover_filename = secrets.token_hex(8) + f_ext.lower()
             f.save(os.path.join(current_app.config["UPLOAD_FOLDER"], cover_filename))
             new_book.cover = cover_filename
         elif form.cover_url.data:
@@ -445,24 +447,39 @@ def book_add():
                 # Download external URL
                 if cover_url and '/static/uploads/' not in cover_url and cover_url.startswith(('http://', 'https://')):
                     current_app.logger.info(f"Downloading external cover: {cover_url}")
-                    response = requests.get(cover_url, stream=True, timeout=10)
+                    response = http_session.get(cover_url, stream=True, timeout=(3, 5))
                     response.raise_for_status()
 
                     if response.status_code == 200:
-                        content = b''
-                        for chunk in response.iter_content(chunk_size=1024):
-                            content += chunk
-                            if len(content) > 5 * 1024 * 1024:
-                                raise ValueError("File too large")
+                        max_size = 5 * 1024 * 1024
+                        content_type = response.headers.get('content-type', '')
+                        if content_type and not content_type.startswith('image/'):
+                            raise ValueError(f"Not an image: {content_type}")
+                        content_length = response.headers.get('content-length')
+                        if content_length and int(content_length) > max_size:
+                            raise ValueError("File too large")
 
                         _stem, f_ext = os.path.splitext(urlparse(cover_url).path)
                         if not f_ext or f_ext.lower() not in ['.jpg', '.jpeg', '.png', '.gif']:
                             f_ext = '.jpg'
                         cover_filename = secrets.token_hex(8) + f_ext
 
+                        # Stream straight to disk so only one chunk is held in memory
                         picture_path = os.path.join(current_app.config["UPLOAD_FOLDER"], cover_filename)
-                        with open(picture_path, 'wb') as f:
-                            f.write(content)
+                        written = 0
+                        try:
+                            with open(picture_path, 'wb') as f:
+                                for chunk in response.iter_content(chunk_size=64 * 1024):
+                                    if not chunk:
+                                        continue
+                                    written += len(chunk)
+                                    if written > max_size:
+                                        raise ValueError("File too large")
+                                    f.write(chunk)
+                        except Exception:
+                            if os.path.exists(picture_path):
+                                os.remove(picture_path)
+                            raise
                         new_book.cover = cover_filename
                         current_app.logger.info(f"Downloaded and saved cover: {cover_filename}")
             except Exception as e:
@@ -613,12 +630,7 @@ def book_edit(book_id):
         book.authors.clear()
         author_names = [name.strip()
                         for name in form.author.data.split(',') if name.strip()]
-        for name in author_names:
-            author = Author.query.filter_by(name=name).first()
-            if not author:
-                author = Author(name=name)
-                db.session.add(author)
-            book.authors.append(author)
+        book.authors.extend(Author.get_or_create_many(author_names))
 
         book.genres.clear()
         selected_genres = form.genres.data
@@ -630,7 +642,10 @@ def book_edit(book_id):
         if form.cover.data:
             if isinstance(form.cover.data, FileStorage):
                 f = form.cover.data
-                cover_filename = secure_filename(f.filename)
+                # Same naming as book_add: the client's filename is only a
+                # source of the (already validated) extension
+                _stem, f_ext = os.path.splitext(f.filename)
+                cover_filename = secrets.token_hex(8) + f_ext.lower()
                 f.save(os.path.join(
                     current_app.config["UPLOAD_FOLDER"], cover_filename))
                 book.cover = cover_filename
@@ -901,15 +916,20 @@ def get_offline_books_data():
     Used by PWA to pre-cache all books for offline access.
     """
     try:
-        from sqlalchemy.orm import joinedload, subqueryload
-        load_opts = [joinedload(Book.library), subqueryload(Book.authors)]
-        # Admin gets all books, others get only books from their libraries
+        from sqlalchemy.orm import joinedload, selectinload
+        load_opts = [joinedload(Book.library), selectinload(Book.authors)]
+        # Admin gets all books, others get only books from their libraries.
+        # The whole catalogue is serialised here, so fetch it in batches:
+        # yield_per streams rows from the cursor and each batch of Book rows
+        # can be released once its dicts are built, instead of holding every
+        # ORM instance for the tenant in the identity map at once.
         if current_user.role == 'admin':
-            books = Book.query.options(*load_opts).filter_by(tenant_id=current_user.tenant_id).all()
+            books = Book.query.options(*load_opts).filter_by(
+                tenant_id=current_user.tenant_id).yield_per(500)
         else:
             user_library_ids = [lib.id for lib in current_user.libraries if lib.tenant_id == current_user.tenant_id]
             books = Book.query.options(*load_opts).filter(Book.library_id.in_(user_library_ids),
-                                                          Book.tenant_id == current_user.tenant_id).all()
+                                                          Book.tenant_id == current_user.tenant_id).yield_per(500)
 
         books_data = []
         for book in books:
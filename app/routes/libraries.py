@@ -24,7 +24,7 @@ bp = Blueprint("libraries", __name__)
 def libraries():
     # eager-load shared links so template can show existing share info
     if current_user.is_admin:
-        all_libraries = Library.query.options(db.subqueryload(Library.shared_links))
+        all_libraries = Library.query.options(db.selectinload(Library.shared_links))
         all_libraries = all_libraries.filter_by(tenant_id=current_user.tenant_id).order_by(Library.name).all()
     elif current_user.is_manager:
         # limit to manager's libraries, load links manually
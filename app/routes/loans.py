@@ -3,12 +3,14 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from flask_babel import _
 from sqlalchemy import or_
+from sqlalchemy.orm import contains_eager, defer, joinedload, lazyload, selectinload
 
 from app import db, csrf
 from app.forms import LoanForm
-from app.models import Book, Loan, User, Library, Notification
+from app.models import Book, Loan, User, Library, LOAN_STATUSES
 from app.utils import role_required, create_notification
 from app.utils.audit_log import log_action
+from app.utils.query_options import list_load_options
 from app.utils.messages import (
     LOAN_CREATED, LOAN_UPDATED, LOAN_COMPLETED, BOOK_RESERVED,
     BOOK_ALREADY_RESERVED, ERROR_PERMISSION_DENIED,
@@ -52,29 +54,36 @@ def loans():
             flash(LOAN_FILTER_INVALID_USER, "danger")
      # Apply status filter
     status_filter = request.args.get('status')
-    if status_filter:
+    if status_filter in LOAN_STATUSES:
         loan_query = loan_query.filter(Loan.status == status_filter)
 
     # Order the results for consistent display (e.g., by loan date descending)
     loan_query = loan_query.order_by(Loan.reservation_date.desc())
 
+    # Book and User are already joined for filtering; populate the template's
+    # loan.book / loan.user from those joins instead of lazy-loading per row.
+    # The list never shows authors, genres, memberships or the book
+    # description, so skip the eager loaders those models declare by default
+    # and leave the Text column out of the SELECT.
+    loan_query = loan_query.options(*list_load_options(
+        contains_eager(Loan.book).options(lazyload('*'), defer(Book.description)),
+        contains_eager(Loan.user).lazyload('*'),
+    ))
+
     # Execute the final query to get filtered loans
     filtered_loans = loan_query.all()
 
-    # Get users for the user filter dropdown
+    # Get users for the user filter dropdown (id/username only, so skip the
+    # eager library/favorites loaders User declares by default)
     if current_user.role == 'admin':
-        all_users = User.query.order_by(User.username).all()
+        all_users = User.query.options(lazyload('*')).order_by(User.username).all()
     else:  # manager
         manager_lib_ids = [lib.id for lib in current_user.managed_libraries]
         if not manager_lib_ids:
             all_users = []
         else:
-            all_users = db.session.query(User).join(User.libraries).filter(
-                Library.id.in_(manager_lib_ids)).order_by(User.username).distinct().all()
-
-    unread_notifications_count = Notification.query.filter_by(
-        recipient=current_user, is_read=False
-    ).count()
+            all_users = db.session.query(User).options(lazyload('*')).filter(
+                User.libraries.any(Library.id.in_(manager_lib_ids))).order_by(User.username).all()
 
     return render_template("loans/loans.html", loans=filtered_loans, users=all_users, active_page="loans", parent_page="admin", title=_("Loans"),
                            now=datetime.utcnow())
@@ -98,8 +107,8 @@ def request_reservation(book_id, user_id):
                 _("You already have an active or pending reservation for this book."), "info")
             return redirect(url_for("main.home"))
 
-        # Change status to 'reserved'
-        book.status = 'reserved'
+    # Change status to 'reserved' unless someone else got there first
+    if book.status == 'available' and book.change_status('available', 'reserved'):
         # Create new record with pending status
         new_loan = Loan(book=book, user=user,
                         reservation_date=datetime.utcnow(), status='pending', tenant_id=book.tenant_id)
@@ -135,18 +144,20 @@ def borrow_book(book_id, user_id):
     book = Book.query.get_or_404(book_id)
     user = User.query.get_or_404(user_id)
 
-    if book.status == 'available':
-        book.status = 'on_loan'
+    if book.status == 'available' and book.change_status('available', 'on_loan'):
         new_loan = Loan(book=book, user=user, status='active', issue_date=datetime.utcnow(), tenant_id=book.tenant_id)
         # defensive assignments to ensure DB value is correct
         new_loan.status = 'active'
         new_loan.issue_date = new_loan.issue_date or datetime.utcnow()
         db.session.add(new_loan)
+        # Read before the commit expires them, so the audit line needs no
+        # reload of the book and user rows
+        title, username = book.title, user.username
         db.session.commit()
         # Audit: book borrowed
         try:
-            log_action('LOAN_BORROWED', f'Book {book.title} borrowed by {user.username}',
-                       subject=new_loan, additional_info={'book_id': book.id, 'user_id': user.id})
+            log_action('LOAN_BORROWED', f'Book {title} borrowed by {username}',
+                       subject=new_loan, additional_info={'book_id': book_id, 'user_id': user_id})
         except Exception:
             pass
         flash(LOANS_BORROWED_SUCCESS, "success")
@@ -158,15 +169,19 @@ def borrow_book(book_id, user_id):
 @bp.route("/return_book/<int:book_id>", methods=["GET", "POST"])
 @login_required
 def return_book(book_id):
-    loan = Loan.query.filter_by(book_id=book_id, status='active').first()
+    # Book and borrower come back in the same SELECT; their names are read
+    # before the commit expires them, so the audit line needs no refresh
+    loan = Loan.query.options(joinedload(Loan.book), joinedload(Loan.user)).filter_by(
+        book_id=book_id, status='active').first()
     if loan:
+        title, username = loan.book.title, loan.user.username
         loan.book.status = 'available'
         loan.return_date = datetime.utcnow()
         loan.status = 'returned'
         db.session.commit()
         # Audit: book returned
         try:
-            log_action('LOAN_RETURNED', f'Book {loan.book.title} returned by {loan.user.username}',
+            log_action('LOAN_RETURNED', f'Book {title} returned by {username}',
                        subject=loan, additional_info={'loan_id': loan.id})
         except Exception:
             pass
@@ -249,8 +264,9 @@ def cancel_loan(loan_id):
 @csrf.exempt
 @role_required('admin', 'manager')
 def return_loan(loan_id):
-    loan = Loan.query.get_or_404(loan_id)
+    loan = Loan.query.options(joinedload(Loan.book)).get_or_404(loan_id)
     if loan.status == 'active':
+        title = loan.book.title
         loan.book.status = 'available'
         loan.return_date = datetime.utcnow()
         loan.status = 'returned'
@@ -258,7 +274,7 @@ def return_loan(loan_id):
 
         # --- Create notification for user ---
         message = _("The book \"%(title)s\" that you loaned has been marked as returned.",
-                    title=loan.book.title)
+                    title=title)
         create_notification(loan.user, current_user,
                             message, 'loan_returned', loan=loan, send_email=True)
 
@@ -268,7 +284,7 @@ def return_loan(loan_id):
         except Exception:
             pass
 
-        flash(LOANS_ADMIN_RETURNED % {'title': loan.book.title}, 'success')
+        flash(LOANS_ADMIN_RETURNED % {'title': title}, 'success')
     else:
         flash(LOANS_NOT_ACTIVE, 'info')
     return redirect(url_for('loans.loans'))
@@ -277,9 +293,11 @@ def return_loan(loan_id):
 @bp.route("/loans/<user_id>")
 @login_required
 def user_loans(user_id):
-    user_loans = User.query.get_or_404(user_id).loans
-    user_loans = sorted(
-        user_loans, key=lambda x: x.reservation_date, reverse=True)
+    user = User.query.get_or_404(user_id)
+    user_loans = Loan.query.filter_by(user_id=user.id).options(
+        *list_load_options(selectinload(Loan.book).options(lazyload('*'), defer(Book.description)),
+                           selectinload(Loan.user).lazyload('*'))
+    ).order_by(Loan.reservation_date.desc()).all()
     return render_template("loans/loans.html", loans=user_loans, active_page="", title="My Loans")
 
 
@@ -288,34 +306,29 @@ def user_loans(user_id):
 @role_required('admin', 'manager')
 def loan_add():
     form = LoanForm()
-    # Populate choices for books and users
-    # We only want to loan available books
-    form.book_id.choices = [(b.id, b.title) for b in Book.query.filter_by(
-        status='available').order_by(Book.title).all()]
-    form.user_id.choices = [(u.id, u.username)
-                            for u in User.query.order_by(User.username).all()]
 
     if form.validate_on_submit():
         book = Book.query.get(form.book_id.data)
         user = User.query.get(form.user_id.data)
-        if book and user and book.status == 'available':
-            book.status = 'on_loan'
+        if book and user and book.status == 'available' and book.change_status('available', 'on_loan'):
             new_loan = Loan(book=book, user=user,
                             reservation_date=datetime.utcnow(),
                             issue_date=datetime.utcnow(),
                             status='active', tenant_id=book.tenant_id)
             db.session.add(new_loan)
+            # Read before the commit expires them (see borrow_book)
+            title, username = book.title, user.username
             db.session.commit()
 
             try:
-                log_action('LOAN_CREATED_ADMIN', f'Loan {new_loan.id} created by admin {current_user.username} for user {user.username}', subject=new_loan, additional_info={
+                log_action('LOAN_CREATED_ADMIN', f'Loan {new_loan.id} created by admin {current_user.username} for user {username}', subject=new_loan, additional_info={
                            'loan_id': new_loan.id})
             except Exception:
                 pass
 
             # --- Create notification for user ---
             message = _("A loan for \"%(title)s\" has been directly issued to you by an administrator.",
-                        title=book.title)
+                        title=title)
             create_notification(user, current_user, message,
                                 'admin_issued_loan', loan=new_loan, send_email=True)
 
@@ -325,6 +338,15 @@ def loan_add():
             flash(LOANS_BOOK_UNAVAILABLE, "danger")
         else:
             flash(LOANS_INVALID_BOOK_USER, "danger")
+
+    # Choices are only needed to render the selects; LoanForm validates the
+    # submitted ids with a primary-key lookup, so POSTs skip these queries.
+    # Select only (id, label) columns: full Book/User rows would also fire
+    # their eager author/genre/library/favorites loaders on every render.
+    # We only want to loan available books
+    form.book_id.choices = [tuple(row) for row in db.session.query(Book.id, Book.title).filter_by(
+        status='available').order_by(Book.title)]
+    form.user_id.choices = [tuple(row) for row in db.session.query(User.id, User.username).order_by(User.username)]
     return render_template("loans/loan_add.html", form=form, active_page="loans", parent_page="admin", title="Add Loan")
 
 
@@ -6,17 +6,18 @@ from math import ceil
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, make_response, jsonify, session, Response
 from flask_login import login_required, current_user
 from flask_babel import _, ngettext
-from sqlalchemy import or_
-from sqlalchemy.orm import joinedload, subqueryload
+from sqlalchemy import or_, select
+from sqlalchemy.orm import defer, joinedload, lazyload, selectinload
 import os
 
 from app import db, csrf, limiter, cache
-from app.models import Book, Genre, Notification, User, ContactMessage, Author, Library
+from app.models import Book, Genre, Notification, User, ContactMessage, Author, Library, Loan, book_authors
 from app.forms import ContactForm
 from app.services.book_service import BookSearchService
 from app.services.cover_service import CoverService
 from app.services.recommendation_service import RecommendationService
-from app.services.cache_service import get_dashboard_cache_version
+from app.services.cache_service import get_dashboard_cache_version, get_genres_cached
+from app.utils.query_options import list_load_options
 from app.utils.messages import (
     INFO_LANGUAGE_CHANGED_EN, INFO_LANGUAGE_CHANGED_PL,
     ERROR_UNSUPPORTED_LANGUAGE, ERROR_PERMISSION_DENIED, NOTIFICATION_MARKED_READ,
@@ -25,6 +26,12 @@ from app.utils.messages import (
 
 bp = Blueprint("main", __name__)
 
+# The dashboard template reads library, authors and genres of every listed book.
+# Only relationships it never touches raise in debug/testing: the same Book and
+# Library instances are reused later in the request (recommendations, favorites).
+_DASHBOARD_BOOK_OPTIONS = (joinedload(Book.library), selectinload(Book.authors), selectinload(Book.genres))
+_DASHBOARD_BOOK_RAISE_ON = (Book.location, Book.favorited_by)
+
 
 def make_dashboard_cache_key(user_scope, cache_version, title_filter, status_filter, genre_filter_id, library_filter_id, sort_by, page):
     key_parts = [
@@ -100,6 +107,24 @@ class SimplePagination:
 
 # --- HELPER FUNCTIONS ---
 
+def _book_search_clause(text):
+    """Match books by title, description or author name.
+
+    Authors are matched through a ``book_id`` subquery rather than an outer
+    join, so the outer query needs no DISTINCT over whole Book rows.
+    """
+    search_term = f"%{text}%"
+    author_book_ids = (
+        select(book_authors.c.book_id)
+        .join(Author, Author.id == book_authors.c.author_id)
+        .where(Author.name.ilike(search_term))
+    )
+    return or_(
+        Book.title.ilike(search_term),
+        Book.description.ilike(search_term),
+        Book.id.in_(author_book_ids),
+    )
+
 
 # --- KONTAKT ---
 @bp.route('/contact', methods=['GET', 'POST'])
@@ -144,32 +169,24 @@ def my_messages():
         except Exception:
             pass
 
-        # Create notification for admins and library managers
+        # Notify all tenant admins (scope to current tenant) and the library's
+        # managers; only their ids are needed, so skip loading User rows.
         library = msg.library
-        # Notify all tenant admins (scope to current tenant)
-        admins = User.query.filter_by(role='admin', tenant_id=current_user.tenant_id).all()
-        for admin in admins:
-            notification = Notification(
-                recipient_id=admin.id,
-                sender_id=current_user.id,
-                contact_message_id=msg.id,
-                message=_('New contact message from library %(library)s', library=library.name),
-                type='contact_message'
-            )
-            db.session.add(notification)
-
-        # Notify library managers (users with manager role in this library)
-        for membership in library.user_library_memberships:
-            if membership.library_role == 'manager':
-                manager = membership.user
-                notification = Notification(
-                    recipient_id=manager.id,
-                    sender_id=current_user.id,
-                    contact_message_id=msg.id,
-                    message=_('New contact message from library %(library)s', library=library.name),
-                    type='contact_message'
-                )
-                db.session.add(notification)
+        admin_ids = db.session.scalars(
+            select(User.id).filter_by(role='admin', tenant_id=current_user.tenant_id)).all()
+        manager_ids = [membership.user_id for membership in library.user_library_memberships
+                       if membership.library_role == 'manager']
+        notification_message = _('New contact message from library %(library)s', library=library.name)
+        Notification.bulk_create([
+            {
+                'recipient_id': recipient_id,
+                'sender_id': current_user.id,
+                'contact_message_id': msg.id,
+                'message': notification_message,
+                'type': 'contact_message',
+            }
+            for recipient_id in admin_ids + manager_ids
+        ])
 
         db.session.commit()
         flash(_('Message has been sent.'), 'success')
@@ -245,6 +262,31 @@ def index():
     return render_template("index.html")
 
 
+def _book_list_urls(books, favorite_book_ids):
+    """Return ``{book_id: {link: url}}`` for the dashboard book list.
+
+    The list is rendered twice (table and mobile card grid), so building the
+    links here halves the ``url_for`` calls, and only the links a row can
+    actually show are built at all.
+    """
+    can_edit = current_user.is_admin or current_user.is_manager
+    urls = {}
+    for book in books:
+        favorite_endpoint = 'books.remove_favorite' if book.id in favorite_book_ids else 'books.add_favorite'
+        links = {
+            'detail': url_for('books.book_detail', book_id=book.id),
+            'favorite': url_for(favorite_endpoint, book_id=book.id),
+        }
+        if book.cover:
+            links['cover'] = url_for('static', filename='uploads/' + book.cover)
+        if book.status == 'available':
+            links['reserve'] = url_for('loans.request_reservation', book_id=book.id, user_id=current_user.id)
+        if can_edit:
+            links['edit'] = url_for('books.book_edit', book_id=book.id)
+        urls[book.id] = links
+    return urls
+
+
 @bp.route("/dashboard")
 @login_required
 @limiter.limit("20 per minute")
@@ -278,11 +320,9 @@ def home():
         total_books = cached_page.get('total', 0)
 
         if book_ids:
-            books = Book.query.options(
-                joinedload(Book.library),
-                subqueryload(Book.authors),
-                subqueryload(Book.genres),
-            ).filter(Book.id.in_(book_ids)).all()
+            books = Book.query.options(*list_load_options(
+                *_DASHBOARD_BOOK_OPTIONS, raise_on=_DASHBOARD_BOOK_RAISE_ON
+            )).filter(Book.id.in_(book_ids)).all()
             books_by_id = {book.id: book for book in books}
             books = [books_by_id[bid] for bid in book_ids if bid in books_by_id]
         else:
@@ -312,14 +352,7 @@ def home():
 
         if title_filter:
             # Search in title, description, and author names with stemming support
-            search_term = f"%{title_filter}%"
-            query = query.outerjoin(Book.authors).filter(
-                or_(
-                    Book.title.ilike(search_term),
-                    Book.description.ilike(search_term),
-                    Author.name.ilike(search_term)
-                )
-            ).distinct()
+            query = query.filter(_book_search_clause(title_filter))
 
         if status_filter:
             if status_filter == 'available':
@@ -343,19 +376,16 @@ def home():
         else:
             query = query.order_by(Book.title.asc())
 
-        pagination = query.options(
-            joinedload(Book.library),
-            subqueryload(Book.authors),
-            subqueryload(Book.genres),
-        ).paginate(page=page, per_page=per_page, error_out=False)
+        pagination = query.options(*list_load_options(
+            *_DASHBOARD_BOOK_OPTIONS, raise_on=_DASHBOARD_BOOK_RAISE_ON
+        )).paginate(page=page, per_page=per_page, error_out=False)
 
         books = pagination.items
         total_books = pagination.total
 
         cache.set(cache_key, {'ids': [book.id for book in books], 'total': total_books}, timeout=20)
 
-    genres = Genre.query.all()
-    genres = sorted(genres, key=lambda g: _(g.name))
+    genres = sorted(get_genres_cached(), key=lambda g: _(g.name))
 
     # Libraries visible to the current user (for library filter dropdown)
     if current_user.is_super_admin:
@@ -403,6 +433,8 @@ def home():
     return render_template("books/index.html", books=books, genres=genres, active_page="books",
                            recommended_books=recommended_books,
                            favorite_book_ids=favorite_book_ids,
+                           book_urls=_book_list_urls(books, favorite_book_ids),
+                           default_cover_url=url_for('static', filename='images/default-book-cover.png'),
                            user_libraries=user_libraries,
                            unread_notifications_count=unread_notifications_count,
                            pagination=pagination,
@@ -451,14 +483,7 @@ def api_search_books():
     # --- END OF FILTERING ---
 
     # Search in title, description, and author names
-    search_term = f"%{search_query}%"
-    query = query.outerjoin(Book.authors).filter(
-        or_(
-            Book.title.ilike(search_term),
-            Book.description.ilike(search_term),
-            Author.name.ilike(search_term)
-        )
-    ).distinct().order_by(Book.title.asc()).limit(limit)
+    query = query.filter(_book_search_clause(search_query)).order_by(Book.title.asc()).limit(limit)
 
     books = query.all()
 
@@ -486,11 +511,19 @@ def api_search_books():
 @login_required
 def view_notifications():
     if current_user.is_admin:
-        notifications = Notification.query.filter(
-            Notification.recipient_id == current_user.id).order_by(Notification.timestamp.desc()).all()
+        notifications_query = Notification.query.filter(
+            Notification.recipient_id == current_user.id)
     else:
-        notifications = Notification.query.filter_by(
-            recipient=current_user).order_by(Notification.timestamp.desc()).all()
+        notifications_query = Notification.query.filter_by(
+            recipient=current_user)
+
+    # The list shows the related loan's book title and borrower; load them in
+    # two IN batches instead of three lazy loads per notification (the book
+    # description is never rendered here, so it stays out of the SELECT).
+    notifications = notifications_query.options(*list_load_options(
+        selectinload(Notification.loan).selectinload(Loan.book).options(lazyload('*'), defer(Book.description)),
+        selectinload(Notification.loan).selectinload(Loan.user).lazyload('*'),
+    )).order_by(Notification.timestamp.desc()).all()
 
     unread_notifications_count = Notification.query.filter_by(
         recipient=current_user, is_read=False
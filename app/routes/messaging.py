@@ -4,9 +4,11 @@ Routes for messaging between tenant admins and super-admin
 from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app
 from flask_login import login_required, current_user
 from flask_babel import _
+from sqlalchemy.orm import selectinload, undefer
 
 from app import db, csrf
 from app.models import AdminSuperAdminConversation, AdminSuperAdminMessage, Tenant, User, Notification
+from app.utils.query_options import list_load_options
 
 bp = Blueprint("messaging", __name__, url_prefix="/messaging")
 
@@ -196,7 +198,14 @@ def super_admin_messages():
     if not current_user.is_super_admin:
         abort(403)
 
-    conversations = AdminSuperAdminConversation.query.order_by(
+    # Unread counts come from the deferred correlated subquery in the same
+    # SELECT; tenant, admin and messages are batch-loaded for the table.
+    conversations = AdminSuperAdminConversation.query.options(*list_load_options(
+        undefer(AdminSuperAdminConversation.unread_count),
+        selectinload(AdminSuperAdminConversation.tenant).lazyload('*'),
+        selectinload(AdminSuperAdminConversation.admin).lazyload('*'),
+        selectinload(AdminSuperAdminConversation.messages).lazyload('*'),
+    )).order_by(
         AdminSuperAdminConversation.created_at.desc()
     ).all()
 
@@ -3,6 +3,7 @@ import secrets
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, make_response, session
 from flask_login import login_required, current_user
 from flask_babel import _
+from sqlalchemy.orm import lazyload
 
 from app import db
 from app.forms import UserForm, UserEditForm, UserSettingsForm
@@ -130,8 +131,13 @@ def view_contact_message(message_id):
 @login_required
 @role_required('admin', 'manager')
 def users():
+    # The list renders only user columns: skip User's default selectin loads
+    # for every row. Not raiseload: these rows share the identity map with
+    # the logged-in user, who still needs those collections.
+    load_options = (lazyload(User.libraries), lazyload(User.user_library_memberships),
+                    lazyload(User.favorites))
     if current_user.role == 'admin':
-        all_users = User.for_tenant(current_user.tenant_id).distinct().all()
+        all_users = User.for_tenant(current_user.tenant_id).options(*load_options).all()
     else:  # manager
         manager_library_ids = [
             lib.id for lib in current_user.managed_libraries if lib.tenant_id == current_user.tenant_id]
@@ -139,10 +145,12 @@ def users():
             # Show only self if not managing any library
             all_users = [current_user]
         else:
-            all_users = db.session.query(User).join(User.libraries).filter(
-                Library.id.in_(manager_library_ids),
+            # EXISTS instead of JOIN + DISTINCT: a member of several managed
+            # libraries is still one row, without de-duplicating every column
+            all_users = db.session.query(User).filter(
+                User.libraries.any(Library.id.in_(manager_library_ids)),
                 User.tenant_id == current_user.tenant_id
-            ).distinct().all()
+            ).options(*load_options).all()
 
     return render_template("users/users.html", users=all_users, active_page="users", parent_page="admin")
 
@@ -328,17 +336,17 @@ def user_delete(user_id):
 @login_required
 def user_profile(user_id):
     # fetch fresh user instance (allows viewing other profiles later)
-    from app.models import User
+    from app.models import User, Loan, Book
     from app.services.recommendation_service import RecommendationService
 
     user = User.query.options(
-        db.subqueryload(User.loans),
-        db.subqueryload(User.favorites)
+        db.selectinload(User.favorites)
     ).get_or_404(user_id)
 
-    # Sort all loans by date, newest first
-    all_loans = sorted(
-        user.loans, key=lambda x: x.reservation_date, reverse=True)
+    # All loans, newest first, with the book title each row renders
+    all_loans = user.loans.options(
+        db.selectinload(Loan.book).options(db.lazyload('*'), db.defer(Book.description))
+    ).order_by(Loan.reservation_date.desc()).all()
     active_loans = [loan for loan in all_loans if loan.status == 'active']
     loan_history = [
         loan for loan in all_loans
@@ -370,7 +378,8 @@ def user_profile(user_id):
 @bp.route("/user/settings", methods=["GET", "POST"])
 @login_required
 def user_settings():
-    from flask_babel import _
+    # The request body cap is applied by limit_profile_picture_upload in
+    # app/__init__.py; FileSize on the form still checks the file itself.
     user = current_user
     if not user:
         flash(USERS_SETTINGS_NO_USER, "danger")
@@ -380,10 +389,10 @@ def user_settings():
 
     if form.validate_on_submit():
         if form.picture.data:
-            # Create a secure, unique filename
-            random_hex = secrets.token_hex(8)
-            _, f_ext = os.path.splitext(form.picture.data.filename)
-            picture_filename = random_hex + f_ext
+            # Create a secure, unique filename; FileAllowed has already
+            # checked the extension, so only its normalised form is kept.
+            f_ext = os.path.splitext(form.picture.data.filename)[1].lower()
+            picture_filename = secrets.token_hex(8) + f_ext
             picture_path = os.path.join(
                 current_app.config["UPLOAD_FOLDER"], picture_filename)
             form.picture.data.save(picture_path)
@@ -1,8 +1,13 @@
 """Cache service for frequently accessed data with TTL-based expiration"""
 
+from collections import namedtuple
+
 from app import cache, db
 from flask import current_app
 
+# Lightweight, picklable stand-in for Genre rows (cached in Redis/SimpleCache).
+GenreRow = namedtuple('GenreRow', 'id name')
+
 
 def get_tenant_by_id_cached(tenant_id):
     """Get tenant by ID with caching.
@@ -115,14 +120,16 @@ def get_user_by_id_cached(user_id):
 
     **Important:** SQLAlchemy model instances stored in the cache become
     ``detached`` when the request-local session that originally loaded them is
-    torn down.  Relationships declared with ``lazy='subquery'`` (such as
-    ``User.favorites`` and ``User.libraries``) are eagerly pre-loaded as Python
+    torn down.  Relationships declared with an eager loader (``lazy='selectin'``
+    on ``User.favorites`` and ``User.libraries``) are pre-loaded as Python
     lists and remain accessible on detached instances.  Calling
     ``db.session.merge()`` on a stale cached object was found to corrupt the
     current session's identity-map by overwriting live state with cached stale
-    state, so the cached object is now returned as-is.  Call
-    ``invalidate_user_cache(user_id)`` whenever user data (including favorites)
-    is changed so the next request fetches a fresh copy from the database.
+    state, so the cached object is now returned as-is.  ORM writes to the
+    ``User`` row or its ``UserLibrary`` memberships evict the entry through
+    mapper events in ``app.models``; changes made with Core statements (such
+    as the ``favorites`` inserts/deletes) must still call
+    ``invalidate_user_cache(user_id)`` explicitly.
     """
     from app.models import User
 
@@ -148,6 +155,33 @@ def invalidate_user_cache(user_id):
     cache.delete(f'recs_{user_id}')
 
 
+def get_genres_cached():
+    """Get all genres as ``GenreRow(id, name)`` tuples, ordered by id.
+
+    Genres are practically read-only, yet the book form and the catalogue
+    filter read the full list on every request.
+
+    Returns:
+        list of GenreRow
+
+    Cache behavior:
+        - Cached for CACHE_DEFAULT_TIMEOUT (default 1 hour)
+        - Cache key: 'genres_all'
+        - Cleared by the Genre mapper events in app.models on any write
+    """
+    rows = cache.get('genres_all')
+    if rows is None:
+        from app.models import Genre
+        rows = [GenreRow(*row) for row in db.session.query(Genre.id, Genre.name).order_by(Genre.id)]
+        cache.set('genres_all', rows, timeout=current_app.config.get('CACHE_DEFAULT_TIMEOUT', 3600))
+    return rows
+
+
+def invalidate_genre_cache():
+    """Invalidate the cached genre list (see ``get_genres_cached``)."""
+    cache.delete('genres_all')
+
+
 def get_dashboard_cache_version(tenant_id=None, superadmin=False):
     """Return the current dashboard cache version.
 
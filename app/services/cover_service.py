@@ -29,6 +29,8 @@ import socket
 import io
 from PIL import Image
 
+from app.utils.http_client import http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -188,7 +190,7 @@ class CoverService:
                 "format": "json"
             }
 
-            response = requests.get(
+            response = http_session.get(
                 "https://openlibrary.org/api/books",
                 params=params,
                 timeout=CoverService.TIMEOUT
@@ -247,7 +249,7 @@ class CoverService:
                 return None
 
             # Download with security checks
-            response = requests.get(cover_url, stream=True, timeout=CoverService.TIMEOUT)
+            response = http_session.get(cover_url, stream=True, timeout=CoverService.TIMEOUT)
             response.raise_for_status()
 
             # Re-validate final URL after redirects to prevent SSRF via redirects
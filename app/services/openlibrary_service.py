@@ -10,6 +10,8 @@ from typing import List, Dict, Optional, Set
 import logging
 import re
 
+from app.utils.http_client import http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -149,7 +151,7 @@ class OpenLibraryClient:
                 "format": "json"
             }
 
-            response = requests.get(
+            response = http_session.get(
                 OpenLibraryClient.ISBN_API_URL,
                 params=params,
                 timeout=OpenLibraryClient.TIMEOUT
@@ -207,7 +209,7 @@ class OpenLibraryClient:
                 "fields": "title,author_name,first_publish_year,isbn,cover_i"
             }
 
-            response = requests.get(
+            response = http_session.get(
                 OpenLibraryClient.SEARCH_API_URL,
                 params=params,
                 timeout=OpenLibraryClient.TIMEOUT
@@ -392,8 +394,7 @@ class OpenLibraryClient:
         Returns:
             List of genre IDs that match the subjects
         """
-        from app.models import Genre
-        from flask_babel import gettext as _real
+        from app.services.cache_service import get_genres_cached
 
         mapped_genre_names = OpenLibraryClient.map_ol_subjects_to_genres(ol_subjects)
 
@@ -401,16 +402,18 @@ class OpenLibraryClient:
             logger.info(f"No genres mapped from OL subjects: {ol_subjects}")
             return []
 
+        # Resolve every mapped name against the cached genre list (one
+        # case-insensitive dict lookup each) instead of one query per name
+        ids_by_name = {}
+        for genre in get_genres_cached():
+            ids_by_name.setdefault(genre.name.lower(), genre.id)
+
         genre_ids = []
         for genre_name in mapped_genre_names:
-            # Query for genre - need to check both with and without translation
-            genre = Genre.query.filter(
-                Genre.name.ilike(genre_name)
-            ).first()
-
-            if genre:
-                genre_ids.append(genre.id)
-                logger.info(f"Mapped OL subject to genre ID {genre.id}: {genre_name}")
+            genre_id = ids_by_name.get(genre_name.lower())
+            if genre_id is not None:
+                genre_ids.append(genre_id)
+                logger.info(f"Mapped OL subject to genre ID {genre_id}: {genre_name}")
             else:
                 logger.warning(f"No genre found for: {genre_name}")
 
@@ -2,12 +2,17 @@ import math
 import re
 from collections import Counter
 from typing import Dict, List
+from sqlalchemy import select
 
 from app import db
 from app.models import Book
 
 _stempel_stemmer = None
 
+# _normalize_text runs for every candidate book on each recommendation pass
+_NON_WORD_RE = re.compile(r"[^a-ząćęłńóśżź0-9\s]")
+_WHITESPACE_RE = re.compile(r'\s+')
+
 
 def _get_stempel_stemmer():
     """Returns (and initializes if necessary) the singleton Stempel stemmer for Polish."""
@@ -50,8 +55,8 @@ class RecommendationService:
         if not value:
             return ''
         text = value.lower()
-        text = re.sub(r"[^a-ząćęłńóśżź0-9\s]", ' ', text)
-        return re.sub(r'\s+', ' ', text).strip()
+        text = _NON_WORD_RE.sub(' ', text)
+        return _WHITESPACE_RE.sub(' ', text).strip()
 
     @staticmethod
     def _stem_pl(token: str) -> str:
@@ -199,7 +204,7 @@ class RecommendationService:
         favorite_ids = {book.id for book in favorite_books}
         query = query.filter(~Book.id.in_(favorite_ids))
 
-        load_opts = [db.subqueryload(Book.authors), db.subqueryload(Book.genres)]
+        load_opts = [db.selectinload(Book.authors), db.selectinload(Book.genres)]
 
         from app.models import book_genres as bg_table, book_authors as ba_table
 
@@ -208,10 +213,11 @@ class RecommendationService:
 
         # Pull books that share at least one genre with the user's favourites.
         if favorite_genre_ids:
+            # Match on a book_id subquery instead of joining and DISTINCT-ing
+            # whole Book rows (description included) in the database.
+            genre_book_ids = select(bg_table.c.book_id).where(bg_table.c.genre_id.in_(favorite_genre_ids))
             genre_q = (
-                query.join(bg_table, Book.id == bg_table.c.book_id)
-                .filter(bg_table.c.genre_id.in_(favorite_genre_ids))
-                .distinct()
+                query.filter(Book.id.in_(genre_book_ids))
                 .options(*load_opts)
                 .limit(candidate_limit)
             )
@@ -222,10 +228,9 @@ class RecommendationService:
 
         # Pull books that share at least one author with the user's favourites.
         if favorite_author_ids:
+            author_book_ids = select(ba_table.c.book_id).where(ba_table.c.author_id.in_(favorite_author_ids))
             author_q = (
-                query.join(ba_table, Book.id == ba_table.c.book_id)
-                .filter(ba_table.c.author_id.in_(favorite_author_ids))
-                .distinct()
+                query.filter(Book.id.in_(author_book_ids), ~Book.id.in_(seen_ids))
                 .options(*load_opts)
                 .limit(candidate_limit)
             )
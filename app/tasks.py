@@ -1,30 +1,60 @@
 from datetime import datetime
+from sqlalchemy.orm import selectinload
 from app import create_app, db
-from app.models import Loan, Notification, User
+from app.models import Book, Loan, Notification
 from app.utils.notifications import create_notification
-from flask_babel import _
+from flask import current_app
+from flask_babel import _, force_locale
 
 # This script should be run periodically (e.g. daily) via cron or scheduler
 
+# Active loans are scanned in id-ordered batches of this size
+OVERDUE_SCAN_BATCH_SIZE = 500
+
 
 def send_automatic_overdue_notifications():
     app = create_app()
     with app.app_context():
         now = datetime.utcnow()
-        overdue_loans = Loan.query.filter_by(status='active').all()
-        for loan in overdue_loans:
-            if not loan.issue_date or not loan.book or not loan.book.library:
-                continue
-            overdue_days = loan.book.library.loan_overdue_days or 14
-            days_since_issue = (now - loan.issue_date).days
-            # Check if already notified
-            already_notified = any(n.type == 'overdue_reminder' for n in loan.notifications)
-            if days_since_issue > overdue_days and not already_notified:
-                message = _(
-                    "Reminder: Your loan for \"%(title)s\" is overdue. Please return it as soon as possible.", title=loan.book.title)
-                user = User.query.get(loan.user_id)
-                create_notification(user, None, message, 'overdue_reminder', loan=loan)
-                print(f"Sent overdue reminder for loan {loan.id} to user {user.username}")
+        session = db.session()
+        # create_notification commits per reminder; keep the batch's preloaded
+        # book/library/user loaded across those commits instead of re-selecting
+        # them one row at a time.
+        session.expire_on_commit = False
+        already_notified = Loan.notifications.any(Notification.type == 'overdue_reminder')
+        last_id = 0
+        while True:
+            batch = Loan.query.filter(
+                Loan.status == 'active',
+                Loan.issue_date.isnot(None),
+                ~already_notified,
+                Loan.id > last_id,
+            ).options(
+                selectinload(Loan.book).selectinload(Book.library),
+                selectinload(Loan.user),
+            ).order_by(Loan.id).limit(OVERDUE_SCAN_BATCH_SIZE).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for loan in batch:
+                if not loan.book or not loan.book.library:
+                    continue
+                overdue_days = loan.book.library.loan_overdue_days or 14
+                days_since_issue = (now - loan.issue_date).days
+                if days_since_issue > overdue_days:
+                    # No request here, so translate in the borrower's language
+                    lang = loan.user.preferred_locale or current_app.config.get('BABEL_DEFAULT_LOCALE')
+                    with force_locale(lang):
+                        message = _(
+                            "Reminder: Your loan for \"%(title)s\" is overdue. Please return it as soon as possible.",
+                            title=loan.book.title)
+                    create_notification(loan.user, None, message, 'overdue_reminder', loan=loan)
+                    print(f"Sent overdue reminder for loan {loan.id} to user {loan.user.username}")
+
+            # Drop the batch from the identity map so memory stays flat
+            # however many loans are active.
+            session.expunge_all()
 
 
 if __name__ == "__main__":
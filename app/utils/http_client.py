@@ -0,0 +1,26 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def _build_session():
+    """Return a ``requests.Session`` with a bounded keep-alive pool.
+
+    ``requests.get`` creates and discards a session per call, so every
+    Open Library lookup or cover download paid for a new TCP and TLS
+    handshake. Sharing one session lets repeated calls to the same host
+    reuse a pooled connection; ``pool_maxsize`` caps how many sockets each
+    host can hold open across worker threads. Only a failed connect is
+    retried (once): read timeouts and error statuses are not, so a slow
+    host cannot hold a worker for a multiple of the caller's timeout.
+    """
+    session = requests.Session()
+    retries = Retry(connect=1, read=0, status=0)
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# Shared by the outbound API clients; pass ``timeout=`` on every call.
+http_session = _build_session()
@@ -21,31 +21,40 @@ def create_notification(recipients, sender, message, notification_type, loan=Non
     if not isinstance(recipients, list):
         recipients = [recipients]
 
-    sent_list = []
-    for recipient in recipients:
-        # Merge to avoid session conflicts with multiple User instances
-        merged_recipient = db.session.merge(recipient)
-        merged_sender = db.session.merge(sender)
+    # A freshly created loan may not have been flushed yet; its id is needed
+    # for the rows below.
+    db.session.flush()
+    sender_id = sender.id if sender is not None else None
+    loan_id = loan.id if loan is not None else None
 
-        new_notification = Notification(
-            recipient=merged_recipient,
-            sender=merged_sender,
-            message=message,
-            type=notification_type,
-            loan=loan
-        )
-        db.session.add(new_notification)
+    # One multi-row INSERT for the whole fan-out instead of merging each
+    # recipient/sender and adding a Notification per recipient.
+    rows = [
+        {
+            'recipient_id': recipient.id,
+            'sender_id': sender_id,
+            'message': message,
+            'type': notification_type,
+            'loan_id': loan_id,
+        }
+        for recipient in recipients
+    ]
+    Notification.bulk_create(rows)
 
-        if send_email and merged_recipient.email:
+    sent_list = []
+    if send_email:
+        from app.utils.mailer import send_generic_email
+        for recipient in recipients:
+            if not recipient.email:
+                continue
             # choose locale from user preference or fallback
-            lang = getattr(merged_recipient, 'preferred_locale', None) or current_app.config.get('BABEL_DEFAULT_LOCALE')
+            lang = getattr(recipient, 'preferred_locale', None) or current_app.config.get('BABEL_DEFAULT_LOCALE')
             try:
                 with force_locale(lang):
                     subj = email_subject or _('Notification from Libriya')
                     body = message
-                from app.utils.mailer import send_generic_email
-                send_generic_email(merged_recipient.email, subj, body)
-                sent_list.append(merged_recipient.email)
+                send_generic_email(recipient.email, subj, body)
+                sent_list.append(recipient.email)
             except Exception:
                 # swallow errors; logging could be added if desired
                 pass
@@ -13,22 +13,34 @@ Migration from PBKDF2 to Argon2:
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError, InvalidHash
 from werkzeug.security import check_password_hash as check_pbkdf2
+from flask import current_app, has_app_context
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Initialize Argon2 hasher with production-ready parameters
-# Memory: 512 MB (moderate, suitable for web servers)
-# Time: 2 iterations (typical for web use)
-# Parallelism: 2 (suitable for most servers)
+# Initialize Argon2id hasher (RFC 9106 "second recommended" profile)
+# Memory: 64 MiB per hash (bounded so concurrent logins fit in worker RAM)
+# Time: 2 passes, tuned for roughly 100-150 ms per hash on a web server
+# Parallelism: 1 (each request already runs in its own worker thread)
 ph = PasswordHasher(
-    memory_cost=512,  # KiB
-    time_cost=2,       # iterations
-    parallelism=2,     # threads
-    hash_len=32,       # output bytes
-    salt_len=16,       # random salt length
+    memory_cost=64 * 1024,  # KiB
+    time_cost=2,            # iterations
+    parallelism=1,          # lanes
+    hash_len=32,            # output bytes
+    salt_len=16,            # random salt length
 )
 
+# Minimum-cost Argon2id for the test suite, which hashes in nearly every
+# fixture; hashes keep the same format so assertions on them still hold.
+_testing_ph = PasswordHasher(memory_cost=8, time_cost=1, parallelism=1, hash_len=32, salt_len=16)
+
+
+def _hasher() -> PasswordHasher:
+    """Return the production hasher, or the cheap one when TESTING is set."""
+    if has_app_context() and current_app.config.get('TESTING'):
+        return _testing_ph
+    return ph
+
 
 def hash_password(password: str) -> str:
     """
@@ -40,13 +52,13 @@ def hash_password(password: str) -> str:
         password: Plain text password to hash
         
     Returns:
-        Argon2 hash string (e.g., '$argon2id$v=19$m=262144,t=2,p=2$...')
+        Argon2 hash string (e.g., '$argon2id$v=19$m=65536,t=2,p=1$...')
     """
     if not password:
         raise ValueError("Password cannot be empty")
     
     try:
-        return ph.hash(password)
+        return _hasher().hash(password)
     except Exception as e:
         logger.error(f"Error hashing password: {e}")
         raise ValueError(f"Failed to hash password: {e}")
@@ -71,10 +83,11 @@ def verify_password(password: str, password_hash: str) -> bool:
     
     # Try Argon2 first (new)
     try:
-        ph.verify(password_hash, password)
+        hasher = _hasher()
+        hasher.verify(password_hash, password)
         
         # Check if rehashing is needed (e.g., updated parameters)
-        if ph.check_needs_rehash(password_hash):
+        if hasher.check_needs_rehash(password_hash):
             logger.info("Password hash needs rehashing with updated parameters")
             # This should trigger a rehash in the User model
             return True
@@ -109,12 +122,12 @@ def password_needs_rehash(password_hash: str) -> bool:
     Returns:
         True if rehashing is recommended, False otherwise
     """
-    # Legacy PBKDF2 hashes always need rehashing
-    if password_hash.startswith('pbkdf2:'):
+    # Legacy werkzeug hashes (pbkdf2/scrypt) always need rehashing
+    if password_hash.startswith(('pbkdf2:', 'scrypt:')):
         return True
     
     # Check Argon2 parameters
     try:
-        return ph.check_needs_rehash(password_hash)
+        return _hasher().check_needs_rehash(password_hash)
     except (InvalidHash, Exception):
         return True  # If we can't parse it, rehash
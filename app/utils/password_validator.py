@@ -2,7 +2,7 @@ from wtforms.validators import ValidationError
 from flask_babel import lazy_gettext as _
 import re
 import hashlib
-import requests
+from app.utils.http_client import http_session
 
 
 class PasswordValidationError(ValueError):
@@ -47,7 +47,7 @@ def check_pwned_password(password: str, timeout: float = 5.0) -> int:
     suffix = sha1[5:]
     url = f'https://api.pwnedpasswords.com/range/{prefix}'
     headers = {'User-Agent': 'Libriya-Password-Checker'}
-    resp = requests.get(url, headers=headers, timeout=timeout)
+    resp = http_session.get(url, headers=headers, timeout=timeout)
     resp.raise_for_status()
     for line in resp.text.splitlines():
         parts = line.split(':')
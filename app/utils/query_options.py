@@ -0,0 +1,25 @@
+from flask import current_app
+from sqlalchemy.orm import raiseload
+
+
+def list_load_options(*options, raise_on=None):
+    """Return loader options for a list query, adding ``raiseload('*')`` in debug/testing.
+
+    List views should eager-load every relationship their template touches.
+    Outside production any relationship that was not loaded explicitly raises
+    instead of silently issuing one extra query per row, so N+1 regressions
+    show up in the test suite rather than in page latency.
+
+    Pass ``raise_on`` to raise only for those relationships when the rows stay
+    in the identity map and later code in the same request may still lazy-load
+    others.
+
+    Usage:
+        Loan.query.options(*list_load_options(selectinload(Loan.book)))
+        Book.query.options(*list_load_options(joinedload(Book.library), raise_on=(Book.location,)))
+    """
+    if current_app.debug or current_app.config.get('TESTING'):
+        if raise_on is None:
+            return (*options, raiseload('*'))
+        return (*options, *(raiseload(rel) for rel in raise_on))
+    return options
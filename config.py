@@ -36,17 +36,27 @@ class Config(BaseSettings):
         # Set SQLALCHEMY_DATABASE_URI to match DATABASE_URL
         self.SQLALCHEMY_DATABASE_URI = self.DATABASE_URL
 
-        # Configure engine options based on database type
-        if 'mysql' in self.DATABASE_URL or 'mariadb' in self.DATABASE_URL:
-            self.SQLALCHEMY_ENGINE_OPTIONS = {
+        # Compiled SQL cache shared by all queries on the engine. The default
+        # 500 entries is too small once every route/tenant filter combination
+        # is counted, and evictions mean recompiling ORM queries per request.
+        self.SQLALCHEMY_ENGINE_OPTIONS = {'query_cache_size': 1200}
+
+        # Configure engine options based on database type. Server databases
+        # get a bounded QueuePool: pre-ping drops connections the server
+        # closed, recycle stays under typical shared-host wait_timeout values
+        # and pool_timeout fails fast instead of queueing requests forever.
+        if not self.DATABASE_URL.startswith('sqlite'):
+            self.SQLALCHEMY_ENGINE_OPTIONS.update({
                 'pool_size': 10,
-                'pool_recycle': 3600,
-                'pool_pre_ping': True,
                 'max_overflow': 20,
-                'connect_args': {
+                'pool_timeout': 30,
+                'pool_recycle': 1800,
+                'pool_pre_ping': True,
+            })
+            if 'mysql' in self.DATABASE_URL or 'mariadb' in self.DATABASE_URL:
+                self.SQLALCHEMY_ENGINE_OPTIONS['connect_args'] = {
                     'charset': 'utf8mb4',
                 }
-            }
 
         return self
 
@@ -0,0 +1,40 @@
+"""Add partial indexes on open book/loan statuses
+
+Revision ID: g567890123ab
+Revises: f456789012ab
+Create Date: 2026-10-16 00:00:00.000000
+
+Changes:
+  1. book — ix_book_available on status, restricted to status='available'
+     (the catalogue's browseable inventory filter).
+
+  2. loan — ix_loan_open on status, restricted to pending/active loans.
+
+PostgreSQL and SQLite build real partial indexes; MySQL ignores the WHERE
+clause and builds a plain index on the status column.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'g567890123ab'
+down_revision = 'f456789012ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_book_available', 'book', ['status'], unique=False,
+        postgresql_where=sa.text("status = 'available'"),
+        sqlite_where=sa.text("status = 'available'"),
+    )
+    op.create_index(
+        'ix_loan_open', 'loan', ['status'], unique=False,
+        postgresql_where=sa.text("status IN ('pending', 'active')"),
+        sqlite_where=sa.text("status IN ('pending', 'active')"),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_loan_open', table_name='loan')
+    op.drop_index('ix_book_available', table_name='book')
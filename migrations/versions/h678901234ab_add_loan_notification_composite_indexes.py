@@ -0,0 +1,44 @@
+"""Add composite indexes for loan and notification lookups
+
+Revision ID: h678901234ab
+Revises: g567890123ab
+Create Date: 2026-10-16 00:00:00.000000
+
+Changes:
+  1. loan — (user_id, status) and (book_id, status) for "active loans for
+     user X" and "who currently has book Y".
+
+  2. notification — (recipient_id, is_read) for the unread badge,
+     (recipient_id, timestamp) for the notification list, and a partial
+     ix_notif_unread on recipient_id restricted to unread rows (plain index
+     on MySQL, which ignores the WHERE clause).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'h678901234ab'
+down_revision = 'g567890123ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_loan_user_status', 'loan', ['user_id', 'status'], unique=False)
+    op.create_index('ix_loan_book_status', 'loan', ['book_id', 'status'], unique=False)
+
+    op.create_index('ix_notif_recipient_unread', 'notification', ['recipient_id', 'is_read'], unique=False)
+    op.create_index('ix_notif_recipient_timestamp', 'notification', ['recipient_id', 'timestamp'], unique=False)
+    op.create_index(
+        'ix_notif_unread', 'notification', ['recipient_id'], unique=False,
+        postgresql_where=sa.text('is_read = false'),
+        sqlite_where=sa.text('is_read = 0'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_notif_unread', table_name='notification')
+    op.drop_index('ix_notif_recipient_timestamp', table_name='notification')
+    op.drop_index('ix_notif_recipient_unread', table_name='notification')
+
+    op.drop_index('ix_loan_book_status', table_name='loan')
+    op.drop_index('ix_loan_user_status', table_name='loan')
@@ -0,0 +1,66 @@
+"""Normalize stored ISBNs to bare 10/13 character keys
+
+Revision ID: i789012345ab
+Revises: h678901234ab
+Create Date: 2026-10-16 00:00:00.000000
+
+Changes:
+  1. book.isbn — strip hyphens/spaces and upper-case the ISBN-10 check
+     digit so every row matches Book.normalize_isbn() and equality lookups
+     on the unique index compare canonical keys.  Blank values become NULL.
+     Rows whose ISBNs only differed in formatting would collide on the
+     unique index; the oldest row (lowest id) keeps the ISBN and the later
+     ones are set to NULL and reported before the UPDATE runs.
+
+Data-only migration; downgrade is a no-op (the original formatting is not
+recoverable and the normalized values remain valid).
+"""
+from alembic import op
+import logging
+import sqlalchemy as sa
+
+revision = 'i789012345ab'
+down_revision = 'h678901234ab'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def _normalize(value):
+    # Same transformation as the UPDATE below, so collisions are predicted exactly.
+    cleaned = value.replace('-', '').replace(' ', '').upper()
+    return cleaned or None
+
+
+def upgrade():
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, isbn FROM book WHERE isbn IS NOT NULL ORDER BY id"
+    )).fetchall()
+
+    seen = {}
+    duplicates = []
+    for book_id, isbn in rows:
+        key = _normalize(isbn)
+        if key is None:
+            continue
+        if key in seen:
+            duplicates.append((book_id, isbn, seen[key]))
+        else:
+            seen[key] = book_id
+
+    for book_id, isbn, kept_id in duplicates:
+        logger.warning("normalize_book_isbn: book %s ISBN %r duplicates book %s; setting it to NULL",
+                       book_id, isbn, kept_id)
+        conn.execute(sa.text("UPDATE book SET isbn = NULL WHERE id = :id"), {'id': book_id})
+
+    op.execute(
+        "UPDATE book SET isbn = UPPER(REPLACE(REPLACE(isbn, '-', ''), ' ', '')) "
+        "WHERE isbn IS NOT NULL"
+    )
+    op.execute("UPDATE book SET isbn = NULL WHERE isbn = ''")
+
+
+def downgrade():
+    pass
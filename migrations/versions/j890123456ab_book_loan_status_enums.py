@@ -0,0 +1,63 @@
+"""Store book/loan status as native ENUM columns
+
+Revision ID: j890123456ab
+Revises: i789012345ab
+Create Date: 2026-10-16 00:00:00.000000
+
+Changes:
+  1. book.status — VARCHAR(50) -> ENUM('available', 'reserved', 'on_loan')
+  2. loan.status — VARCHAR(50) -> ENUM('pending', 'active', 'returned',
+     'cancelled')
+
+MySQL stores these as 1-byte ENUMs; PostgreSQL gets named types created
+before the ALTER.  SQLite keeps VARCHAR (batch mode rebuilds the table).
+Rows holding a value outside the set must be fixed before upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'j890123456ab'
+down_revision = 'i789012345ab'
+branch_labels = None
+depends_on = None
+
+book_status = sa.Enum('available', 'reserved', 'on_loan', name='book_status')
+loan_status = sa.Enum('pending', 'active', 'returned', 'cancelled', name='loan_status')
+
+
+def upgrade():
+    bind = op.get_bind()
+    book_status.create(bind, checkfirst=True)
+    loan_status.create(bind, checkfirst=True)
+
+    with op.batch_alter_table('book', schema=None) as batch_op:
+        batch_op.alter_column('status',
+                              existing_type=sa.String(length=50),
+                              type_=book_status,
+                              existing_nullable=False,
+                              postgresql_using='status::book_status')
+
+    with op.batch_alter_table('loan', schema=None) as batch_op:
+        batch_op.alter_column('status',
+                              existing_type=sa.String(length=50),
+                              type_=loan_status,
+                              existing_nullable=False,
+                              postgresql_using='status::loan_status')
+
+
+def downgrade():
+    with op.batch_alter_table('loan', schema=None) as batch_op:
+        batch_op.alter_column('status',
+                              existing_type=loan_status,
+                              type_=sa.String(length=50),
+                              existing_nullable=False)
+
+    with op.batch_alter_table('book', schema=None) as batch_op:
+        batch_op.alter_column('status',
+                              existing_type=book_status,
+                              type_=sa.String(length=50),
+                              existing_nullable=False)
+
+    bind = op.get_bind()
+    loan_status.drop(bind, checkfirst=True)
+    book_status.drop(bind, checkfirst=True)
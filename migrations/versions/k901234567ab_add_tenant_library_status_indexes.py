@@ -0,0 +1,34 @@
+"""Add composite status indexes for tenant/library filters and unread messages
+
+Revision ID: k901234567ab
+Revises: j890123456ab
+Create Date: 2026-10-16 00:00:00.000000
+
+Changes:
+  1. loan — (tenant_id, status) for "pending loans in tenant X".
+
+  2. book — (library_id, status) for "available books in library X".
+
+  3. admin_super_admin_message — (conversation_id, read) for the
+     per-conversation unread count.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'k901234567ab'
+down_revision = 'j890123456ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_loan_tenant_status', 'loan', ['tenant_id', 'status'], unique=False)
+    op.create_index('ix_book_lib_status', 'book', ['library_id', 'status'], unique=False)
+    op.create_index('ix_adminmsg_conv_read', 'admin_super_admin_message',
+                    ['conversation_id', 'read'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_adminmsg_conv_read', table_name='admin_super_admin_message')
+    op.drop_index('ix_book_lib_status', table_name='book')
+    op.drop_index('ix_loan_tenant_status', table_name='loan')
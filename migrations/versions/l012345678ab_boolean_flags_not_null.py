@@ -0,0 +1,46 @@
+"""Make read/resolved flags NOT NULL with a server-side false default
+
+Revision ID: l012345678ab
+Revises: k901234567ab
+Create Date: 2026-10-16 00:00:00.000000
+
+Changes:
+  notification.is_read, contact_message.read_by_admin,
+  contact_message.is_resolved and admin_super_admin_message.read were
+  nullable. Rows with NULL are backfilled to false and the columns become
+  NOT NULL DEFAULT false, so "flag = false" predicates (and the partial
+  ix_notif_unread index) see every unread row and rows inserted outside the
+  ORM still get a value.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'l012345678ab'
+down_revision = 'k901234567ab'
+branch_labels = None
+depends_on = None
+
+FLAGS = (
+    ('notification', 'is_read'),
+    ('contact_message', 'read_by_admin'),
+    ('contact_message', 'is_resolved'),
+    ('admin_super_admin_message', 'read'),
+)
+
+
+def upgrade():
+    for table, column in FLAGS:
+        t = sa.table(table, sa.column(column, sa.Boolean()))
+        op.execute(t.update().where(t.c[column].is_(None)).values({column: sa.false()}))
+
+    for table, column in FLAGS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.Boolean(), nullable=False,
+                                  server_default=sa.false())
+
+
+def downgrade():
+    for table, column in FLAGS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.Boolean(), nullable=True,
+                                  server_default=None)
@@ -0,0 +1,27 @@
+"""Add (tenant_id, status) index on book
+
+Revision ID: m123456789ab
+Revises: l012345678ab
+Create Date: 2026-10-16 00:00:00.000000
+
+Changes:
+  book — (tenant_id, status) for the tenant admin catalogue filtered by
+  availability. Loan (tenant_id, status), book (library_id, status),
+  notification (recipient_id, is_read) and message (conversation_id, read)
+  are already covered by earlier revisions.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'm123456789ab'
+down_revision = 'l012345678ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_book_tenant_status', 'book', ['tenant_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_book_tenant_status', table_name='book')
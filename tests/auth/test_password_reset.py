@@ -51,3 +51,23 @@ def test_token_consume_changes_password_and_logs(app, client, regular_user):
     # Token should be marked used
     entry = PasswordResetToken.query.filter_by(user_id=regular_user.id).first()
     assert entry.used
+
+
+def test_token_hashed_with_blake2b_and_legacy_sha256_still_verifies(app, regular_user):
+    import datetime
+    import hashlib
+
+    token = PasswordResetToken.generate_token(regular_user.id, expires_in=3600)
+    entry = PasswordResetToken.verify_token(token)
+    assert entry.token_hash == hashlib.blake2b(token.encode(), digest_size=32).hexdigest()
+
+    # tokens issued before the switch were stored as sha256
+    legacy = 'legacy-token'
+    db.session.add(PasswordResetToken(
+        user_id=regular_user.id,
+        token_hash=hashlib.sha256(legacy.encode()).hexdigest(),
+        expires_at=datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+    ))
+    db.session.commit()
+    assert PasswordResetToken.verify_token(legacy) is not None
+    assert PasswordResetToken.verify_token('unknown') is None
@@ -0,0 +1,20 @@
+from config import Config
+
+
+def test_sqlite_only_sizes_the_statement_cache():
+    cfg = Config(SECRET_KEY='x', DATABASE_URL='sqlite:///:memory:')
+    assert cfg.SQLALCHEMY_ENGINE_OPTIONS == {'query_cache_size': 1200}
+
+
+def test_server_databases_get_pool_settings():
+    mysql = Config(SECRET_KEY='x', DATABASE_URL='mysql+pymysql://u:p@db/libriya')
+    opts = mysql.SQLALCHEMY_ENGINE_OPTIONS
+    assert opts['pool_pre_ping'] is True
+    assert opts['query_cache_size'] == 1200
+    assert opts['pool_size'] == 10 and opts['max_overflow'] == 20
+    assert opts['pool_timeout'] == 30 and opts['pool_recycle'] == 1800
+    assert opts['connect_args'] == {'charset': 'utf8mb4'}
+
+    pg = Config(SECRET_KEY='x', DATABASE_URL='postgresql://u:p@db/libriya')
+    assert pg.SQLALCHEMY_ENGINE_OPTIONS['pool_pre_ping'] is True
+    assert 'connect_args' not in pg.SQLALCHEMY_ENGINE_OPTIONS
@@ -317,3 +317,36 @@ def test_delete_user_rules_and_manager_scope(client, app):
         resp2 = client.post(f'/users/delete/{other_admin.id}', follow_redirects=True)
         assert resp2.status_code in (200, 302)
         assert User.query.get(other_admin.id) is not None
+
+
+def test_manager_user_list_shows_member_of_two_libraries_once(client, app):
+    with app.app_context():
+        t = Tenant(name='T9', subdomain='t9')
+        db.session.add(t)
+        db.session.commit()
+
+        lib_a = Library(name='Lib9A', tenant_id=t.id)
+        lib_b = Library(name='Lib9B', tenant_id=t.id)
+        db.session.add_all([lib_a, lib_b])
+        db.session.commit()
+
+        mgr = User(username='mgr9', email='mgr9@t9.example', role='manager', tenant_id=t.id)
+        mgr.set_password('password')
+        mgr.is_email_verified = True
+        member = User(username='member9', email='member9@t9.example', role='user', tenant_id=t.id)
+        member.set_password('password')
+        db.session.add_all([mgr, member])
+        db.session.flush()
+        db.session.add_all([
+            UserLibrary(user_id=mgr.id, library_id=lib_a.id, library_role='manager'),
+            UserLibrary(user_id=mgr.id, library_id=lib_b.id, library_role='manager'),
+            UserLibrary(user_id=member.id, library_id=lib_a.id),
+            UserLibrary(user_id=member.id, library_id=lib_b.id),
+        ])
+        db.session.commit()
+
+        login(client, 'mgr9')
+        res = client.get('/users/')
+        assert res.status_code == 200
+        # once in the table and once in the mobile card grid
+        assert res.get_data(as_text=True).count('member9@t9.example') == 2
@@ -11,12 +11,16 @@ def test_generate_and_mark_used(app):
 
     token = EmailVerificationToken.generate_token(user.id, expires_in=3600)
     assert token is not None
+    db.session.commit()
 
     entry = EmailVerificationToken.verify_token(token)
     assert entry is not None
     assert entry.user_id == user.id
 
-    entry.mark_used()
+    # the caller owns the transaction
+    assert entry.mark_used() is entry
+    assert entry in db.session.dirty
+    db.session.commit()
     # after marking used, verify_token should return None
     assert EmailVerificationToken.verify_token(token) is None
 
@@ -15,6 +15,9 @@ from app.utils.password_validator import is_strong_password
 from app import db
 from app.models import Genre, Library, Tenant, InvitationCode, User
 
+JPEG_HEAD = b'\xff\xd8\xff\xe0'
+PNG_HEAD = b'\x89PNG\r\n\x1a\n'
+
 
 def test_is_strong_password_basic():
     ok, reasons = is_strong_password('weak')
@@ -94,6 +97,48 @@ def test_bookform_validates_year_and_required_fields(app):
             assert form4.year.data is None
 
 
+def test_bookform_genre_choices_cached_and_invalidated_on_write(app):
+    with app.app_context():
+        first = Genre(name='Poetry')
+        db.session.add(first)
+        db.session.commit()
+
+        with app.test_request_context('/'):
+            assert BookForm().genres.choices == [(first.id, 'Poetry')]
+
+        second = Genre(name='Drama')
+        db.session.add(second)
+        db.session.commit()
+
+        # the insert cleared the shared genre cache, so the next request sees it
+        with app.test_request_context('/'):
+            choices = BookForm().genres.choices
+            assert (second.id, 'Drama') in choices
+            # forms built later in the same request reuse the cached list
+            assert BookForm().genres.choices is choices
+
+
+def test_bookform_year_bound_follows_current_year(app, monkeypatch):
+    import app.forms as forms_module
+
+    class _FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2031, 1, 1)
+
+    with app.test_request_context('/'):
+        form = BookForm(formdata=MultiDict({'year': '2031'}))
+        assert not form.year.validate(form)
+
+        # same form class, later "now": the bound is not frozen at import
+        monkeypatch.setattr(forms_module, 'datetime', _FrozenDatetime)
+        form = BookForm(formdata=MultiDict({'year': '2031'}))
+        assert form.year.validate(form)
+
+        form = BookForm(formdata=MultiDict({'year': '2032'}))
+        assert not form.year.validate(form)
+
+
 def test_userform_password_strength(app):
     with app.app_context():
         # WTForms translations need a request context
@@ -175,11 +220,12 @@ def test_user_settings_picture_file_validation(app):
         with app.test_request_context('/'):
             usf = UserSettingsForm(data={'email': 'me@example.com'})
 
-            small_file = FileStorage(stream=io.BytesIO(b'x' * 1024), filename='small.jpg', content_type='image/jpeg')
+            small_file = FileStorage(stream=io.BytesIO(JPEG_HEAD + b'x' * 1024),
+                                     filename='small.jpg', content_type='image/jpeg')
             usf.picture.data = small_file
             assert usf.validate()  # small image should pass FileAllowed/FileSize
 
-            large_file = FileStorage(stream=io.BytesIO(b'x' * (3 * 1024 * 1024)),
+            large_file = FileStorage(stream=io.BytesIO(JPEG_HEAD + b'x' * (3 * 1024 * 1024)),
                                      filename='large.jpg', content_type='image/jpeg')
             usf2 = UserSettingsForm(data={'email': 'me2@example.com'})
             usf2.picture.data = large_file
@@ -213,7 +259,8 @@ def test_bookform_cover_file_validation(app):
             form = BookForm(data=data)
             form.library.choices = [(lib.id, lib.name)]
 
-            ok_file = FileStorage(stream=io.BytesIO(b'x' * 1024), filename='cover.png', content_type='image/png')
+            ok_file = FileStorage(stream=io.BytesIO(PNG_HEAD + b'x' * 1024),
+                                  filename='cover.png', content_type='image/png')
             form.cover.data = ok_file
             assert form.validate()
 
@@ -225,6 +272,16 @@ def test_bookform_cover_file_validation(app):
             assert not form2.validate()
             assert form2.cover.errors
 
+            # right extension, wrong content: rejected by the magic-byte check
+            renamed = FileStorage(stream=io.BytesIO(b'<?php echo 1; ?>' + b'x' * 1024), filename='cover.jpg',
+                                  content_type='image/jpeg')
+            form3 = BookForm(data=data)
+            form3.library.choices = [(lib.id, lib.name)]
+            form3.cover.data = renamed
+            assert not form3.validate()
+            assert form3.cover.errors
+            assert renamed.stream.tell() == 0
+
 
 def test_registrationform_email_and_username_uniqueness(app):
     with app.app_context():
@@ -285,7 +342,25 @@ def test_comment_and_loan_forms_sanitization_and_required(app):
         lf = LoanForm(data={})
         assert not lf.validate()
 
-        lf2 = LoanForm(data={'book_id': 1, 'user_id': 1})
+        # ids must refer to existing rows
+        lf_missing = LoanForm(data={'book_id': 999, 'user_id': 999})
+        assert not lf_missing.validate()
+        assert lf_missing.book_id.errors and lf_missing.user_id.errors
+
+        from app.models import Book
+        tenant = Tenant(name='LoanFormTenant', subdomain='lft')
+        db.session.add(tenant)
+        db.session.flush()
+        lib = Library(name='LoanFormLib', tenant_id=tenant.id)
+        db.session.add(lib)
+        db.session.flush()
+        book = Book(title='Loanable', library_id=lib.id, tenant_id=tenant.id)
+        user = User(username='borrower', email='borrower@example.com')
+        user.set_password('password')
+        db.session.add_all([book, user])
+        db.session.commit()
+
+        lf2 = LoanForm(data={'book_id': book.id, 'user_id': user.id})
         assert lf2.validate()
 
 
@@ -3,7 +3,8 @@ import pytest
 
 from app import db
 from app.models import (
-    User, Tenant, Library, Book, Genre, Loan, Comment, InvitationCode
+    User, Tenant, Library, Book, Genre, Loan, Comment, InvitationCode, Author,
+    UserLibrary
 )
 
 
@@ -38,6 +39,22 @@ def test_user_password_and_role_properties(app):
     assert ta.is_tenant_admin
 
 
+def test_password_hashed_with_argon2_and_legacy_hash_upgraded(app):
+    from werkzeug.security import generate_password_hash
+
+    u = User(username='argon', email='argon@example.com', role='user')
+    u.set_password('s3cr3t')
+    assert u.password_hash.startswith('$argon2id$')
+
+    # legacy PBKDF2 hash still verifies and is rehashed on success
+    u.password_hash = generate_password_hash('s3cr3t', method='pbkdf2:sha256')
+    assert not u.check_password('wrong')
+    assert u.password_hash.startswith('pbkdf2:')
+    assert u.check_password('s3cr3t')
+    assert u.password_hash.startswith('$argon2id$')
+    assert u.check_password('s3cr3t')
+
+
 def test_tenant_premium_features_and_str(app):
     t = Tenant(name='PremiumTenant', subdomain='pt')
     t.premium_bookcover_enabled = True
@@ -50,6 +67,28 @@ def test_tenant_premium_features_and_str(app):
     assert str(t).startswith('PremiumTenant')
 
 
+def test_tenant_limits_count_in_sql(app):
+    t = Tenant(name='LimitTenant', subdomain='limits', max_libraries=2, max_books=2)
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='LimitLib', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.flush()
+    db.session.add(Book(title='Limit1', library_id=lib.id, tenant_id=t.id))
+    db.session.commit()
+
+    assert t.can_add_library()
+    assert t.can_add_book()
+    # the checks must not populate the relationship collections
+    assert 'libraries' not in t.__dict__ and 'books' not in lib.__dict__
+
+    db.session.add(Library(name='LimitLib2', tenant_id=t.id))
+    db.session.add(Book(title='Limit2', library_id=lib.id, tenant_id=t.id))
+    db.session.commit()
+    assert not t.can_add_library()
+    assert not t.can_add_book()
+
+
 def test_library_defaults_and_relationships(app):
     tenant = Tenant(name='LT', subdomain='lt')
     db.session.add(tenant)
@@ -77,6 +116,58 @@ def test_library_defaults_and_relationships(app):
     assert g in book.genres
 
 
+def test_loading_user_does_not_eager_load_library_members(app):
+    from sqlalchemy import inspect
+
+    tenant = Tenant(name='LM', subdomain='lm')
+    db.session.add(tenant)
+    db.session.commit()
+    lib = Library(name='LibM', tenant_id=tenant.id)
+    db.session.add(lib)
+    users = [User(username=f'lm{i}', email=f'lm{i}@example.com', tenant_id=tenant.id) for i in range(3)]
+    for u in users:
+        u.set_password('pw')
+    db.session.add_all(users)
+    db.session.flush()
+    db.session.add_all([UserLibrary(user_id=u.id, library_id=lib.id) for u in users])
+    db.session.commit()
+    user_id = users[0].id
+    db.session.expunge_all()
+
+    user = db.session.get(User, user_id)
+    loaded_lib = user.libraries[0]
+    # Co-members are only fetched when a caller actually asks for them
+    assert 'users' not in inspect(loaded_lib).dict
+    assert 'user_library_memberships' not in inspect(loaded_lib).dict
+    assert len(loaded_lib.users) == 3
+
+
+def test_book_change_status_is_conditional(app):
+    from sqlalchemy import update
+
+    tenant = Tenant(name='StatusT', subdomain='statust')
+    db.session.add(tenant)
+    db.session.commit()
+    lib = Library(name='StatusLib', tenant_id=tenant.id)
+    db.session.add(lib)
+    db.session.commit()
+    book = Book(title='Contended', library_id=lib.id, tenant_id=tenant.id)
+    db.session.add(book)
+    db.session.commit()
+
+    # another request reserves the copy after we loaded it
+    db.session.execute(update(Book).where(Book.id == book.id).values(status='reserved'),
+                       execution_options={'synchronize_session': False})
+    assert book.status == 'available'
+    assert not book.change_status('available', 'on_loan')
+    assert book.status == 'reserved'
+
+    assert book.change_status('reserved', 'on_loan')
+    assert book.status == 'on_loan'
+    db.session.commit()
+    assert db.session.get(Book, book.id).status == 'on_loan'
+
+
 def test_blank_isbn_stored_as_null_and_allows_multiple(app):
     """Books without an ISBN should not trigger unique constraint errors.
 
@@ -109,6 +200,62 @@ def test_blank_isbn_stored_as_null_and_allows_multiple(app):
     assert Book.query.filter_by(title='Second').one()
 
 
+def test_isbn_normalized_to_canonical_key():
+    assert Book.normalize_isbn(' 978-0-306-40615-7 ') == '9780306406157'
+    assert Book.normalize_isbn('0-8044-2957-x') == '080442957X'
+    assert Book.normalize_isbn(' - ') is None
+    assert Book(title='B', isbn='978 0 306 40615 7').isbn == '9780306406157'
+
+
+def test_author_get_or_create_many_reuses_existing(app):
+    existing = Author(name='Tolkien J.R.R.')
+    db.session.add(existing)
+    db.session.commit()
+
+    authors = Author.get_or_create_many(['Tolkien J.R.R.', 'Lewis C.S.', 'Lewis C.S.'])
+    db.session.commit()
+
+    assert authors[0] is existing
+    assert [a.name for a in authors] == ['Tolkien J.R.R.', 'Lewis C.S.']
+    assert Author.query.count() == 2
+    assert Author.get_or_create_many([]) == []
+
+    # an existing author is found regardless of the input's case
+    assert Author.get_or_create_many(['tolkien j.r.r.']) == [existing]
+    assert Author.query.count() == 2
+
+
+def test_loading_book_collections_does_not_load_reverse_books(app):
+    from sqlalchemy import inspect
+
+    tenant = Tenant(name='ReverseT', subdomain='reverse')
+    db.session.add(tenant)
+    db.session.commit()
+    lib = Library(name='ReverseLib', tenant_id=tenant.id)
+    db.session.add(lib)
+    db.session.commit()
+
+    book = Book(title='Reverse', library_id=lib.id, tenant_id=tenant.id)
+    book.authors.append(Author(name='Reverse Author'))
+    book.genres.append(Genre(name='Reverse Genre'))
+    db.session.add(book)
+    db.session.commit()
+    db.session.expunge_all()
+
+    loaded = Book.query.filter_by(title='Reverse').one()
+    assert 'books' in inspect(loaded.authors[0]).unloaded
+    assert 'books' in inspect(loaded.genres[0]).unloaded
+
+
+def test_book_author_names_and_str():
+    book = Book(title='Hobbit', year=1937)
+    book.authors.extend([Author(name='J.R.R. Tolkien'), Author(name='Lewis, C.S.')])
+    book.genres.append(Genre(name='Fantasy'))
+
+    assert book.author_names == 'Tolkien J.R.R., Lewis C.S.'
+    assert str(book) == 'Hobbit by Tolkien J.R.R., Lewis C.S. (1937) - Genres: Fantasy'
+
+
 def test_blank_year_stored_as_null_and_allows_multiple(app):
     """Books without a publication year should save NULL and not conflict.
 
@@ -162,6 +309,8 @@ def test_loan_and_comment_for_tenant_and_str(app):
     loans = Loan.for_tenant(tenant.id).all()
     assert any(l.id == loan.id for l in loans)
     assert str(loan).startswith('Loan')
+    # Book.loans is a query, filtered in SQL
+    assert book.loans.filter_by(status='pending').count() == 1
 
     # Comment.for_tenant uses Book.tenant_id in join
     comment = Comment(text='Nice', user_id=user.id, book_id=book.id, tenant_id=tenant.id)
@@ -171,6 +320,27 @@ def test_loan_and_comment_for_tenant_and_str(app):
     comments = Comment.for_tenant(tenant.id).all()
     assert any(c.id == comment.id for c in comments)
 
+    # __str__ on a freshly loaded row must not lazy-load its relationships
+    from sqlalchemy import event
+    loan_id, book_id, user_id, comment_id = loan.id, book.id, user.id, comment.id
+    db.session.expunge_all()
+    fresh = Loan.query.get(loan_id)
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    fresh_comment = Comment.query.get(comment_id)
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        label = str(fresh)
+        comment_label = str(fresh_comment)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+    assert label == f'Loan {loan_id}: book #{book_id} to user #{user_id} - Status: pending'
+    assert comment_label.startswith(f'Comment by user #{user_id} on book #{book_id}')
+    assert statements == []
+
 
 def test_invitation_code_validity_and_mark_used(app):
     tenant = Tenant(name='InvTenant', subdomain='inv')
@@ -209,12 +379,38 @@ def test_invitation_code_validity_and_mark_used(app):
     db.session.add(new_user)
     db.session.commit()
 
-    code.mark_as_used(new_user.id)
+    assert code.mark_as_used(new_user.id) is code
+    # the caller owns the transaction
+    assert code in db.session.dirty
+    db.session.commit()
     assert code.used_by_id == new_user.id
     assert code.used_at is not None
     assert not code.is_valid()
 
 
+def test_invitation_code_find_by_code_normalizes_input(app):
+    tenant = Tenant(name='FindTenant', subdomain='findinv')
+    db.session.add(tenant)
+    db.session.commit()
+    lib = Library(name='FindLib', tenant_id=tenant.id)
+    db.session.add(lib)
+    db.session.commit()
+    creator = User(username='findcreator', email='fc@example.com', role='admin', tenant_id=tenant.id)
+    creator.set_password('p')
+    db.session.add(creator)
+    db.session.commit()
+    code = InvitationCode(code='ABCD1234', created_by_id=creator.id, library_id=lib.id,
+                          tenant_id=tenant.id, expires_at=datetime.utcnow() + timedelta(days=1))
+    db.session.add(code)
+    db.session.commit()
+
+    assert InvitationCode.find_by_code('ABCD1234') is code
+    assert InvitationCode.find_by_code(' abcd1234 ') is code
+    assert InvitationCode.find_by_code('ABCD1235') is None
+    assert InvitationCode.find_by_code('') is None
+    assert InvitationCode.find_by_code(None) is None
+
+
 def test_user_for_tenant_query(app):
     tenant = Tenant(name='Utenant', subdomain='ut')
     db.session.add(tenant)
@@ -28,6 +28,33 @@ def test_create_notification_single_and_multiple(app):
     assert Notification.query.filter_by(message='Hello all').count() == 2
 
 
+def test_create_notification_fan_out_is_one_insert(app):
+    from sqlalchemy import event
+
+    users = [User(username=f'fan{i}', email=f'fan{i}@example.com') for i in range(5)]
+    for u in users:
+        u.set_password('password')
+    db.session.add_all(users)
+    db.session.commit()
+
+    inserts = []
+
+    def _record(conn, cursor, statement, *args):
+        if statement.startswith('INSERT INTO notification'):
+            inserts.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        create_notification(users, None, 'Fan out', 'info')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert len(inserts) == 1
+    rows = Notification.query.filter_by(message='Fan out').all()
+    assert {n.recipient_id for n in rows} == {u.id for u in users}
+    assert all(n.timestamp is not None and n.is_read is False for n in rows)
+
+
 def login(client, username, password='password'):
     return client.post('/auth/login/', data={'email_or_username': username, 'password': password}, follow_redirects=True)
 
@@ -135,3 +162,120 @@ def test_create_notification_sends_email(app, monkeypatch):
     assert sent['to'] == u.email
     assert sent['subj'] == 'Custom subj'
     assert 'Hello there' in sent['body']
+
+
+def test_notifications_list_preloads_loan_book_and_user(app, client):
+    from app.models import Book, Loan
+
+    tenant = Tenant(name='NotifLoanT', subdomain='notifloan')
+    db.session.add(tenant)
+    db.session.commit()
+    lib = Library(name='NotifLoanLib', tenant_id=tenant.id)
+    db.session.add(lib)
+    db.session.commit()
+
+    user = User(username='notif_loan_user', email='nlu@example.com', tenant_id=tenant.id)
+    user.is_email_verified = True
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+
+    for i in range(2):
+        book = Book(title=f'NotifBook{i}', library_id=lib.id, tenant_id=tenant.id, status='reserved')
+        db.session.add(book)
+        db.session.flush()
+        loan = Loan(book_id=book.id, user_id=user.id, tenant_id=tenant.id, status='pending')
+        db.session.add(loan)
+        db.session.flush()
+        db.session.add(Notification(recipient_id=user.id, message=f'Loan {i}', type='info', loan_id=loan.id))
+    db.session.commit()
+
+    login(client, 'notif_loan_user')
+    db.session.expunge_all()
+
+    from sqlalchemy import event
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        resp = client.get('/notifications/')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert resp.status_code == 200
+    assert b'NotifBook0' in resp.data and b'NotifBook1' in resp.data
+    # loans and their books are fetched in IN batches, not one lazy load per row
+    assert not [s for s in statements if 'WHERE loan.id = ?' in s or 'WHERE book.id = ?' in s]
+
+
+def test_overdue_scan_reminds_each_overdue_loan_once(app, monkeypatch):
+    from app import tasks
+    from app.models import Book, Loan
+
+    t = Tenant(name='OverdueT', subdomain='overdue')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='OverdueLib', tenant_id=t.id, loan_overdue_days=7)
+    db.session.add(lib)
+    db.session.commit()
+    reader = User(username='late_reader', email='late@example.com', tenant_id=t.id)
+    reader.set_password('password')
+    db.session.add(reader)
+    db.session.commit()
+
+    loans = {}
+    for name, days_ago in (('late', 10), ('fresh', 2), ('later', 30)):
+        book = Book(title=f'Overdue{name}', library_id=lib.id, tenant_id=t.id, status='on_loan')
+        db.session.add(book)
+        db.session.flush()
+        loan = Loan(book_id=book.id, user_id=reader.id, tenant_id=t.id, status='active',
+                    issue_date=datetime.utcnow() - timedelta(days=days_ago))
+        db.session.add(loan)
+        db.session.flush()
+        loans[name] = loan.id
+    db.session.commit()
+
+    monkeypatch.setattr(tasks, 'create_app', lambda: app)
+    monkeypatch.setattr(tasks, 'OVERDUE_SCAN_BATCH_SIZE', 1)
+    tasks.send_automatic_overdue_notifications()
+    # a second run must not remind the same loans again
+    tasks.send_automatic_overdue_notifications()
+
+    reminded = sorted(n.loan_id for n in Notification.query.filter_by(type='overdue_reminder'))
+    assert reminded == sorted([loans['late'], loans['later']])
+
+
+def test_contact_message_notifies_admins_and_library_managers(app, client):
+    from app.models import ContactMessage, UserLibrary
+
+    t = Tenant(name='ContactT', subdomain='contactt')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='ContactLib', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.commit()
+    admin = User(username='c_admin', email='c_admin@example.com', role='admin', tenant_id=t.id)
+    manager = User(username='c_manager', email='c_manager@example.com', role='manager', tenant_id=t.id)
+    member = User(username='c_member', email='c_member@example.com', tenant_id=t.id)
+    for u in (admin, manager, member):
+        u.is_email_verified = True
+        u.set_password('password')
+    db.session.add_all([admin, manager, member])
+    db.session.commit()
+    db.session.add_all([
+        UserLibrary(user_id=manager.id, library_id=lib.id, library_role='manager'),
+        UserLibrary(user_id=member.id, library_id=lib.id, library_role='member'),
+    ])
+    db.session.commit()
+
+    client.post('/auth/login/', data={'email_or_username': member.email, 'password': 'password'})
+    resp = client.post('/my-messages', data={'library': lib.id, 'subject': 'Hi', 'message': 'Question'})
+    assert resp.status_code == 302
+
+    msg = ContactMessage.query.filter_by(user_id=member.id).one()
+    notes = Notification.query.filter_by(type='contact_message', contact_message_id=msg.id).all()
+    assert sorted(n.recipient_id for n in notes) == sorted([admin.id, manager.id])
+    assert all(n.sender_id == member.id and not n.is_read and n.timestamp for n in notes)
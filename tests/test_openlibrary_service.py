@@ -3,6 +3,7 @@ import requests
 from datetime import datetime
 
 from app.services.openlibrary_service import OpenLibraryClient
+from app.utils.http_client import http_session
 from app import db
 from app.models import Genre
 
@@ -49,7 +50,7 @@ def test_search_by_isbn_parsing_and_errors(monkeypatch):
                 }
             }
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: DummyResp())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: DummyResp())
 
     result = OpenLibraryClient.search_by_isbn(sample_isbn)
     assert result is not None
@@ -66,14 +67,14 @@ def test_search_by_isbn_parsing_and_errors(monkeypatch):
         def json(self):
             return {}
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: EmptyResp())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: EmptyResp())
     assert OpenLibraryClient.search_by_isbn(sample_isbn) is None
 
     # simulate timeout
     def raise_timeout(*a, **k):
         raise requests.exceptions.Timeout()
 
-    monkeypatch.setattr(requests, 'get', raise_timeout)
+    monkeypatch.setattr(http_session, 'get', raise_timeout)
     assert OpenLibraryClient.search_by_isbn(sample_isbn) is None
 
 
@@ -96,7 +97,7 @@ def test_search_by_title_and_limit_and_timeout(monkeypatch):
                 ]
             }
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: SR())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: SR())
     res = OpenLibraryClient.search_by_title('testing', limit=5)
     # only docs with isbn should be returned
     assert isinstance(res, list)
@@ -105,7 +106,7 @@ def test_search_by_title_and_limit_and_timeout(monkeypatch):
     assert res[1]['isbn'] == '333'
 
     # simulate timeout
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: (_ for _ in ()).throw(requests.exceptions.Timeout()))
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: (_ for _ in ()).throw(requests.exceptions.Timeout()))
     assert OpenLibraryClient.search_by_title('testing') == []
 
 
@@ -146,7 +147,7 @@ def test_parse_book_data_description_and_year_parsing(monkeypatch):
                 }
             }
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: R())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: R())
     parsed = OpenLibraryClient.search_by_isbn(isbn)
     assert parsed is not None
     assert parsed['year'] == 2005
@@ -192,7 +193,7 @@ def test_search_by_title_limit_capped_and_missing_fields(monkeypatch):
         def json(self):
             return {'docs': docs}
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: SR2())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: SR2())
 
     res = OpenLibraryClient.search_by_title('longquery', limit=50)
     # capped at 20
@@ -104,6 +104,65 @@ def test_book_add_post_as_admin(app, client, monkeypatch):
     assert called['flag'] is True
 
 
+def test_book_add_streams_cover_url_to_disk(app, client, monkeypatch, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    t = Tenant(name='Tcover', subdomain='tcov')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='LibCover', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.commit()
+    g = Genre(name='Fiction')
+    db.session.add(g)
+    db.session.commit()
+    admin = User(username='coveradmin', email='cov@example.com', role='admin', tenant_id=t.id)
+    admin.is_email_verified = True
+    admin.set_password('password')
+    db.session.add(admin)
+    db.session.commit()
+    login(client, admin.email)
+
+    monkeypatch.setattr('app.routes.books.PremiumManager.call', lambda *a, **k: None)
+
+    class FakeResp:
+        status_code = 200
+        headers = {'content-type': 'image/jpeg'}
+
+        def raise_for_status(self):
+            pass
+
+        def iter_content(self, chunk_size=1024):
+            yield b'a' * 10
+            yield b''
+            yield b'b' * 10
+
+    monkeypatch.setattr('app.routes.books.http_session.get', lambda *a, **k: FakeResp())
+    post_data = {
+        'title': 'Streamed Cover',
+        'author': 'Author One',
+        'library': lib.id,
+        'genres': [str(g.id)],
+        'description': 'x',
+        'cover_url': 'https://covers.example.com/b/1.jpg',
+    }
+    client.post('/books/add/', data=post_data, follow_redirects=True)
+    b = Book.query.filter_by(title='Streamed Cover').first()
+    assert b.cover and b.cover.endswith('.jpg')
+    with open(os.path.join(str(tmp_path), b.cover), 'rb') as f:
+        assert f.read() == b'a' * 10 + b'b' * 10
+
+    # non-image responses are rejected before anything is written
+    class HtmlResp(FakeResp):
+        headers = {'content-type': 'text/html'}
+
+    monkeypatch.setattr('app.routes.books.http_session.get', lambda *a, **k: HtmlResp())
+    post_data['title'] = 'Html Cover'
+    client.post('/books/add/', data=post_data, follow_redirects=True)
+    b = Book.query.filter_by(title='Html Cover').first()
+    assert b.cover is None
+    assert len(os.listdir(str(tmp_path))) == 1
+
+
 def test_add_and_remove_favorite(client, app):
     t = Tenant(name='FavT', subdomain='fav')
     db.session.add(t)
@@ -309,6 +368,50 @@ def test_book_detail_comment_posting(app, client):
     assert 'nice comment' in comment.text.lower()
 
 
+def test_book_detail_favorite_state_without_loading_favorited_by(app, client):
+    from sqlalchemy import event
+    from app.models import favorites
+
+    t = Tenant(name='TFav', subdomain='tfav')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='LFav', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.commit()
+    book = Book(title='FavBook', library_id=lib.id, tenant_id=t.id)
+    db.session.add(book)
+    db.session.commit()
+    fans = []
+    for i in range(3):
+        fan = User(username=f'fan{i}', email=f'fan{i}@example.com', tenant_id=t.id)
+        fan.is_email_verified = True
+        fan.set_password('password')
+        fans.append(fan)
+    db.session.add_all(fans)
+    db.session.commit()
+    db.session.execute(favorites.insert(), [{'user_id': f.id, 'book_id': book.id} for f in fans])
+    db.session.commit()
+    book_id = book.id
+
+    login(client, fans[0].email)
+    db.session.expunge_all()
+
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        res = client.get(f'/book/{book_id}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert res.status_code == 200
+    assert b'/favorites/remove/' in res.data
+    assert not [s for s in statements if '= favorites.book_id' in s]
+
+
 def test_cleanup_cover_filename_validation_and_deletion(app, client):
     # login a test user (endpoint requires authentication)
     u = User(username='cleanup_user', email='cu@example.com')
@@ -642,3 +745,39 @@ def test_book_add_uses_google_when_bn_empty(app, client, monkeypatch):
     assert b is not None
     assert b.description == 'Google desc'
     assert called['which'] == 'google'
+
+
+def test_book_edit_cover_upload_gets_random_name(app, client, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    t = Tenant(name='CoverEdit', subdomain='coveredit')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='CoverEditLib', tenant_id=t.id)
+    g = Genre(name='CoverEditGenre')
+    db.session.add_all([lib, g])
+    db.session.commit()
+    admin = User(username='coveradmin', email='coveradmin@example.com', role='admin', tenant_id=t.id)
+    admin.is_email_verified = True
+    admin.set_password('password')
+    db.session.add(admin)
+    book = Book(title='Covered', library_id=lib.id, tenant_id=t.id)
+    book.genres.append(g)
+    db.session.add(book)
+    db.session.commit()
+    login(client, admin.email)
+
+    buf = io.BytesIO()
+    Image.new('RGB', (4, 4)).save(buf, format='PNG')
+    buf.seek(0)
+    res = client.post(f'/book_edit/{book.id}', data={
+        'title': 'Covered',
+        'author': 'Someone',
+        'library': lib.id,
+        'genres': [str(g.id)],
+        'cover': (buf, 'My Cover.PNG'),
+    }, content_type='multipart/form-data')
+
+    assert res.status_code == 302
+    cover = Book.query.get(book.id).cover
+    assert re.fullmatch(r'[0-9a-f]{16}\.png', cover)
+    assert (tmp_path / cover).exists()
@@ -1,6 +1,9 @@
 from datetime import datetime, timedelta
 from app import db
-from app.models import Tenant, Library, User, Book, Loan, Notification, AdminSuperAdminConversation, AdminSuperAdminMessage
+from app.models import (
+    Tenant, Library, User, UserLibrary, Book, Loan, Notification, AdminSuperAdminConversation,
+    AdminSuperAdminMessage
+)
 
 
 def login(client, username, password='password'):
@@ -92,6 +95,7 @@ def test_tenants_and_user_list_markup(client, app):
     assert resp_detail.status_code == 200
     assert b'users-table-container' in resp_detail.data
     assert b'users-grid' in resp_detail.data
+    assert b'tuser' in resp_detail.data
     # cells should allow wrapping to avoid excessive width
     assert b'break-words' in resp_detail.data
     # table should use fixed layout for better wrapping
@@ -155,6 +159,78 @@ def test_user_settings_change_language(client, app):
     assert b'Logout' in resp2.data or b'Wyloguj' in resp2.data
 
 
+def test_user_settings_rejects_oversized_upload_before_parsing(client, app):
+    import io
+
+    user = User(username='bigupload', email='bigupload@example.com', role='user')
+    user.is_email_verified = True
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    login(client, 'bigupload')
+
+    big = (io.BytesIO(b'\xff\xd8\xff' + b'x' * (3 * 1024 * 1024)), 'big.jpg')
+    resp = client.post('/user/settings', data={'email': 'bigupload@example.com', 'picture': big},
+                       content_type='multipart/form-data')
+
+    assert resp.status_code == 302
+    assert User.query.get(user.id).image_file != 'big.jpg'
+    with client.session_transaction() as sess:
+        assert any('too large' in msg for _, msg in sess.get('_flashes', []))
+
+
+def test_user_settings_upload_cap_applies_with_csrf_enabled(client, app):
+    import io
+
+    user = User(username='bigcsrf', email='bigcsrf@example.com', role='user')
+    user.is_email_verified = True
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    login(client, 'bigcsrf')
+
+    # CSRFProtect reads request.form in its own before_request hook, so the
+    # cap has to be in place before that hook parses the body.
+    app.config['WTF_CSRF_ENABLED'] = True
+    big = (io.BytesIO(b'\xff\xd8\xff' + b'x' * (3 * 1024 * 1024)), 'big.jpg')
+    resp = client.post('/user/settings', data={'email': 'bigcsrf@example.com', 'picture': big},
+                       content_type='multipart/form-data')
+
+    assert resp.status_code == 302
+    with client.session_transaction() as sess:
+        flashes = [msg for _, msg in sess.get('_flashes', [])]
+    assert any('too large' in msg for msg in flashes)
+
+
+
+def test_oversized_request_elsewhere_keeps_plain_413(client, app):
+    from werkzeug.exceptions import RequestEntityTooLarge
+
+    with app.test_request_context('/api/v1/search', method='POST'):
+        resp = app.make_response(app.handle_http_exception(RequestEntityTooLarge()))
+    assert resp.status_code == 413
+
+def test_user_settings_picture_gets_random_lowercase_name(client, app, tmp_path):
+    import io
+
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    user = User(username='picupload', email='picupload@example.com', role='user')
+    user.is_email_verified = True
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    login(client, 'picupload')
+
+    pic = (io.BytesIO(b'\x89PNG\r\n\x1a\n' + b'x' * 64), 'My Photo.PNG')
+    resp = client.post('/user/settings', data={'email': 'picupload@example.com', 'picture': pic},
+                       content_type='multipart/form-data')
+
+    assert resp.status_code == 302
+    image_file = User.query.get(user.id).image_file
+    assert image_file.endswith('.png') and 'Photo' not in image_file
+    assert (tmp_path / image_file).exists()
+
+
 def test_responsive_css_breakpoint():
     """Static stylesheet should hide tables on devices up to 1023px wide."""
     import os
@@ -279,6 +355,11 @@ def test_borrow_and_return_flow(app, client):
     assert loan_db.status == 'returned'
     assert loan_db.book.status == 'available'
 
+    # the profile lists the loan history from the dynamic User.loans query
+    profile = client.get(f'/user/profile/{user.id}')
+    assert profile.status_code == 200
+    assert b'BorrowBook' in profile.data
+
 
 def test_user_cancel_reservation_and_admin_notified(app, client):
     t = Tenant(name='CancelTenant', subdomain='ct2')
@@ -359,6 +440,14 @@ def test_admin_send_overdue_reminder(app, client):
     n = Notification.query.filter_by(recipient_id=user.id, type='overdue_reminder').first()
     assert n is not None
 
+    # admin marks the overdue loan as returned
+    resp = client.post(f'/loans/return/{loan.id}', follow_redirects=True)
+    assert resp.status_code == 200
+    assert b'OverdueBook' in resp.data
+    assert Book.query.get(book.id).status == 'available'
+    returned = Notification.query.filter_by(recipient_id=user.id, type='loan_returned').one()
+    assert 'OverdueBook' in returned.message
+
 
 def test_login_syncs_language_cookie_and_db(client, app):
     """If the browser has a language cookie the login process should copy it
@@ -466,3 +555,250 @@ def test_superadmin_reply_sends_email_to_admin(app, client, monkeypatch):
     resp = client.post(f'/messaging/admin/messages/{conv.id}', data={'message': 'reply'}, follow_redirects=True)
     assert resp.status_code == 200
     assert any(admin.email == to for to, _, _ in sent)
+
+
+def test_superadmin_inbox_counts_unread_in_one_query(app, client):
+    from sqlalchemy import event
+
+    supera = User(username='inboxsuper', email='inboxsuper@x.com', role='superadmin')
+    supera.is_email_verified = True
+    supera.set_password('password')
+    db.session.add(supera)
+    db.session.commit()
+    for i in range(3):
+        t = Tenant(name=f'InboxT{i}', subdomain=f'inboxt{i}')
+        db.session.add(t)
+        db.session.flush()
+        admin = User(username=f'inboxadmin{i}', email=f'inboxadmin{i}@x.com', role='admin', tenant_id=t.id)
+        admin.set_password('password')
+        db.session.add(admin)
+        db.session.flush()
+        conv = AdminSuperAdminConversation(tenant_id=t.id, admin_id=admin.id, subject=f'Inbox{i}')
+        db.session.add(conv)
+        db.session.flush()
+        db.session.add_all([
+            AdminSuperAdminMessage(conversation_id=conv.id, sender_id=admin.id, message='a'),
+            AdminSuperAdminMessage(conversation_id=conv.id, sender_id=admin.id, message='b', read=True),
+        ])
+    db.session.commit()
+
+    login(client, supera.email)
+    db.session.expunge_all()
+
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        resp = client.get('/messaging/admin/messages')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert resp.status_code == 200
+    assert b'Inbox2' in resp.data
+    counts = [s for s in statements if 'count(admin_super_admin_message.id)' in s]
+    assert len(counts) == 1
+
+
+def test_loan_list_does_not_eager_load_book_or_user_collections(client, app):
+    """The loan dashboard only renders titles and usernames; the default
+    selectin/subquery loaders on Book and User must not fire for it."""
+    from sqlalchemy import event
+
+    t = Tenant(name='LoanListT', subdomain='loanlist')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='LoanListLib', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.commit()
+
+    admin = User(username='ll_admin', email='lla@example.com', role='admin', tenant_id=t.id)
+    admin.is_email_verified = True
+    admin.set_password('password')
+    db.session.add(admin)
+    db.session.commit()
+
+    for i in range(3):
+        book = Book(title=f'LoanListBook{i}', library_id=lib.id, tenant_id=t.id, status='on_loan')
+        db.session.add(book)
+        db.session.flush()
+        db.session.add(Loan(book_id=book.id, user_id=admin.id, tenant_id=t.id, status='active',
+                            issue_date=datetime.utcnow()))
+    db.session.commit()
+
+    login(client, admin.email)
+    db.session.expunge_all()
+
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        resp = client.get('/loans/')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert resp.status_code == 200
+    assert b'LoanListBook2' in resp.data
+    eager_tables = ('book_authors', 'book_genres', 'user_libraries', 'favorites')
+    assert not [s for s in statements if any(t in s for t in eager_tables)]
+    assert not [s for s in statements if 'book.description' in s]
+
+
+def test_user_list_query_count_does_not_grow_with_users(client, app):
+    """The user list renders only user columns; User's default selectin
+    loaders must not add queries per listed user."""
+    from sqlalchemy import event
+
+    def _tenant_with_users(name, user_count):
+        t = Tenant(name=name, subdomain=name.lower())
+        db.session.add(t)
+        db.session.commit()
+        lib = Library(name=f'{name}Lib', tenant_id=t.id)
+        db.session.add(lib)
+        db.session.flush()
+        admin = User(username=f'{name}_admin', email=f'{name}a@example.com', role='admin', tenant_id=t.id)
+        admin.is_email_verified = True
+        admin.set_password('password')
+        db.session.add(admin)
+        for i in range(user_count):
+            u = User(username=f'{name}_user{i}', email=f'{name}{i}@example.com', tenant_id=t.id)
+            u.set_password('password')
+            db.session.add(u)
+            db.session.flush()
+            db.session.add(UserLibrary(user_id=u.id, library_id=lib.id))
+        db.session.commit()
+        return admin.email
+
+    def _statements_for_user_list(admin_email):
+        client.get('/auth/logout')
+        login(client, admin_email)
+        db.session.expunge_all()
+        statements = []
+
+        def _record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', _record)
+        try:
+            resp = client.get('/users/')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _record)
+        assert resp.status_code == 200
+        return statements
+
+    few = _statements_for_user_list(_tenant_with_users('FewUsers', 2))
+    many = _statements_for_user_list(_tenant_with_users('ManyUsers', 8))
+    assert len(many) == len(few)
+    assert not [s for s in many if 'favorites' in s or 'user_libraries' in s]
+
+
+def test_offline_books_export_lists_whole_catalogue(client, app):
+    from app.models import Author
+    t = Tenant(name='OfflineT', subdomain='offline')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='OfflineLib', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.commit()
+    admin = User(username='off_admin', email='off@example.com', role='admin', tenant_id=t.id)
+    admin.is_email_verified = True
+    admin.set_password('password')
+    db.session.add(admin)
+    author = Author(name='Offline Author')
+    for i in range(5):
+        db.session.add(Book(title=f'OfflineBook{i}', library_id=lib.id, tenant_id=t.id,
+                            authors=[author]))
+    db.session.commit()
+
+    login(client, admin.email)
+    resp = client.get('/api/offline/books')
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['success'] and data['count'] == 5
+    assert {b['title'] for b in data['books']} == {f'OfflineBook{i}' for i in range(5)}
+    assert all(b['library_name'] == 'OfflineLib' for b in data['books'])
+    assert all(b['authors'][0]['id'] == author.id for b in data['books'])
+
+
+def test_search_api_matches_author_names_once_per_book(client, app):
+    from app.models import Author
+    t = Tenant(name='SearchT', subdomain='searcht')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='SearchLib', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.commit()
+    admin = User(username='search_admin', email='search@example.com', role='admin', tenant_id=t.id)
+    admin.is_email_verified = True
+    admin.set_password('password')
+    db.session.add(admin)
+    db.session.add_all([
+        Book(title='Co-written', library_id=lib.id, tenant_id=t.id,
+             authors=[Author(name='Zyxwv One'), Author(name='Zyxwv Two')]),
+        Book(title='Unrelated', library_id=lib.id, tenant_id=t.id, authors=[Author(name='Someone')]),
+    ])
+    db.session.commit()
+
+    login(client, admin.email)
+    resp = client.get('/api/v1/search?q=zyxwv')
+    assert resp.status_code == 200
+    assert [b['title'] for b in resp.get_json()['books']] == ['Co-written']
+
+
+def test_loan_add_form_lists_available_books_and_users(client, app):
+    t = Tenant(name='LoanAddT', subdomain='loanadd')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='LoanAddLib', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.commit()
+
+    admin = User(username='la_admin', email='laa@example.com', role='admin', tenant_id=t.id)
+    admin.is_email_verified = True
+    admin.set_password('password')
+    db.session.add(admin)
+    db.session.add_all([
+        Book(title='FreeBook', library_id=lib.id, tenant_id=t.id, status='available'),
+        Book(title='TakenBook', library_id=lib.id, tenant_id=t.id, status='on_loan'),
+    ])
+    db.session.commit()
+
+    login(client, admin.email)
+    resp = client.get('/loans/add/')
+
+    assert resp.status_code == 200
+    assert b'FreeBook' in resp.data
+    assert b'TakenBook' not in resp.data
+    assert b'la_admin' in resp.data
+
+
+def test_dashboard_book_links_built_once_per_book(client, app):
+    t = Tenant(name='DashLinks', subdomain='dashlinks')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='DashLib', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.commit()
+    admin = User(username='dashadmin', email='dashadmin@example.com', role='admin', tenant_id=t.id)
+    admin.is_email_verified = True
+    admin.set_password('password')
+    db.session.add(admin)
+    db.session.commit()
+    db.session.add(UserLibrary(user_id=admin.id, library_id=lib.id))
+    free = Book(title='FreeBook', library_id=lib.id, tenant_id=t.id, status='available')
+    lent = Book(title='LentBook', library_id=lib.id, tenant_id=t.id, status='on_loan')
+    db.session.add_all([free, lent])
+    db.session.commit()
+
+    login(client, 'dashadmin')
+    html = client.get('/dashboard').get_data(as_text=True)
+
+    assert html.count(f'/book_edit/{free.id}') == 2
+    assert html.count(f'/request_reservation/{free.id}/{admin.id}') == 2
+    assert f'/request_reservation/{lent.id}/' not in html
+    assert html.count('images/default-book-cover.png') >= 4
@@ -8,8 +8,9 @@ from PIL import Image
 from app.services.cover_service import CoverService
 from app.services.openlibrary_service import OpenLibraryClient
 from app.services import cache_service
+from app.utils.http_client import http_session
 from app import db
-from app.models import Tenant, Genre, User, Book, Author
+from app.models import Tenant, Genre, User, Book, Author, Library, UserLibrary
 
 
 def test_validate_url_blocklist_and_schemes():
@@ -41,7 +42,7 @@ def test_get_cover_from_openlibrary_by_isbn_parsing(monkeypatch):
         def json(self):
             return {f'ISBN:{sample_isbn}': {'cover': {'medium': 'http://ol/med.jpg'}}}
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: DummyResp())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: DummyResp())
     url = CoverService._get_cover_from_openlibrary_by_isbn(sample_isbn)
     assert url == 'http://ol/med.jpg'
 
@@ -50,11 +51,11 @@ def test_get_cover_from_openlibrary_by_isbn_parsing(monkeypatch):
         def json(self):
             return {}
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: EmptyResp())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: EmptyResp())
     assert CoverService._get_cover_from_openlibrary_by_isbn(sample_isbn) is None
 
     # timeout
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: (_ for _ in ()).throw(requests.exceptions.Timeout()))
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: (_ for _ in ()).throw(requests.exceptions.Timeout()))
     assert CoverService._get_cover_from_openlibrary_by_isbn(sample_isbn) is None
 
 
@@ -74,7 +75,7 @@ def test_download_and_save_cover_success_and_extension(tmp_path, monkeypatch):
         def iter_content(self, chunk_size=1024):
             yield content
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: FakeResp())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: FakeResp())
 
     upload_folder = str(tmp_path)
     filename = CoverService.download_and_save_cover('http://example.com/pic.png', upload_folder)
@@ -97,7 +98,7 @@ def test_download_and_save_cover_success_and_extension(tmp_path, monkeypatch):
     class BigResp(FakeResp):
         headers = {'content-length': str(CoverService.MAX_COVER_SIZE + 1)}
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: BigResp())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: BigResp())
     assert CoverService.download_and_save_cover('http://example.com/big.jpg', upload_folder) is None
 
 
@@ -125,7 +126,7 @@ def test_download_and_save_cover_rejects_non_image(tmp_path, monkeypatch):
         def iter_content(self, chunk_size=1024):
             yield b'not-an-image'
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: FakeResp())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: FakeResp())
     upload_folder = str(tmp_path)
     assert CoverService.download_and_save_cover('http://example.com/notimage', upload_folder) is None
 
@@ -142,7 +143,7 @@ def test_download_and_save_cover_rejects_redirect_to_private_ip(tmp_path, monkey
         def iter_content(self, chunk_size=1024):
             yield b'0' * 10
 
-    monkeypatch.setattr(requests, 'get', lambda *a, **k: RedirectResp())
+    monkeypatch.setattr(http_session, 'get', lambda *a, **k: RedirectResp())
     assert CoverService.download_and_save_cover('http://example.com/redirect', str(tmp_path)) is None
 
 
@@ -298,15 +299,21 @@ def test_cache_service_tenant_and_user_invalidation(app):
     first_u = cache_service.get_user_by_id_cached(u.id)
     assert first_u is not None
 
+    # ORM updates to the user row evict the cached copy automatically
     u.username = 'cacheu2'
     db.session.commit()
-    still = cache_service.get_user_by_id_cached(u.id)
-    assert still.username != 'cacheu2'
-
-    cache_service.invalidate_user_cache(u.id)
     updated = cache_service.get_user_by_id_cached(u.id)
     assert updated.username == 'cacheu2'
 
+    # ... as do membership changes, which the cached user eager-loads
+    lib = Library(name='CacheLib', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.commit()
+    assert cache_service.get_user_by_id_cached(u.id).libraries == []
+    db.session.add(UserLibrary(user_id=u.id, library_id=lib.id))
+    db.session.commit()
+    assert [x.id for x in cache_service.get_user_by_id_cached(u.id).libraries] == [lib.id]
+
 
 def test_validate_url_allows_when_dns_resolution_fails(monkeypatch):
     import socket
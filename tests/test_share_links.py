@@ -63,3 +63,37 @@ def test_share_link_generation_and_public_access(client, app):
     link.expires_at = link.created_at  # expire immediately
     db.session.commit()
     assert client.get(f'/share/{token}/').status_code == 404
+
+
+def test_share_link_validity_filtered_in_sql(client, app):
+    from datetime import datetime, timedelta
+
+    t = Tenant(name='ShareSqlTenant', subdomain='stsql')
+    db.session.add(t)
+    db.session.commit()
+    lib = Library(name='ShareSqlLib', tenant_id=t.id)
+    db.session.add(lib)
+    db.session.commit()
+    admin = User(username='sharesql', email='sharesql@example.com', role='admin', tenant_id=t.id)
+    admin.set_password('password')
+    db.session.add(admin)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    links = {
+        'open': SharedLink(token='open-link', active=True, expires_at=None),
+        'future': SharedLink(token='future-link', active=True, expires_at=now + timedelta(days=1)),
+        'expired': SharedLink(token='expired-link', active=True, expires_at=now - timedelta(days=1)),
+        'inactive': SharedLink(token='inactive-link', active=False, expires_at=None),
+    }
+    for link in links.values():
+        link.library_id = lib.id
+        link.created_by_id = admin.id
+    db.session.add_all(links.values())
+    db.session.commit()
+
+    valid = {link.token for link in SharedLink.query.filter(SharedLink.is_valid())}
+    assert valid == {link.token for link in links.values() if link.is_valid()}
+    assert valid == {'open-link', 'future-link'}
+    assert client.get('/share/expired-link/').status_code == 404
+    assert client.get('/share/future-link/').status_code == 200